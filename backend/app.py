@@ -1,24 +1,38 @@
-import os
-import shutil
-import tempfile
 import json
+import asyncio
+from datetime import datetime, timedelta
 from typing import List, Optional
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
 
 from schemas import (
-    PantryAnalysisResponse, 
+    PantryAnalysisResponse, BatchPantryAnalysisResponse, ImageScanResult,
     RecipeSuggestionRequest, RecipeSuggestionResponse,
-    VideoSearchRequest, VideoSearchResponse, VideoResult,
+    VideoSearchRequest, VideoSearchResponse,
     PantryItemResponse, SavedRecipeResponse, SaveRecipeRequest
 )
 from services.vision_service import VisionService
 from services.agent_service import AgentService
 from services.search_service import SearchService
 from services.auth_service import AuthService
-from database import init_db, get_db
+from services.video_pipeline import VideoPipeline
+from services.shelf_life_service import ShelfLifeService, days_remaining, urgency_for
+from services.ingredient_canon import canonicalize_all
+from services.image_preprocess import shutdown_pool as shutdown_preprocess_pool
+from services.pantry_scan import PantryScanner, RetakeRequired
+from services.guide_store import GuideStore
+from services.notification_service import NotificationService
+from database import init_db, get_db, dialect_insert
+from dependencies import (
+    UserContext, get_token_payload, require_token_payload,
+    get_current_user, get_optional_user, invalidate_user_context
+)
+from queries import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, pantry_query, recipe_history_query, next_page
 from tasks.scheduler import start_scheduler
+from tasks.outbox_dispatcher import outbox_dispatcher
 from models.db_models import User, PantryItem, SavedRecipe
 from sqlalchemy.future import select
 
@@ -31,16 +45,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Initialize Services
 agent_service = AgentService()
 search_service = SearchService()
+video_pipeline = VideoPipeline(agent_service, search_service)
+shelf_life_service = ShelfLifeService()
+pantry_scanner = PantryScanner()
+
+MAX_BATCH_IMAGES = 8
 
 @app.on_event("startup")
 async def startup_event():
     await init_db()
     start_scheduler()
+    outbox_dispatcher.start()
+    agent_service.router.start_probe()
+    try:
+        await asyncio.to_thread(VisionService.warm_up)
+    except Exception as e:
+        print(f"⚠️ EyePop warm-up failed, endpoints will open on first scan: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await agent_service.router.stop_probe()
+    await asyncio.to_thread(VisionService.shutdown)
+    shutdown_preprocess_pool()
+    await outbox_dispatcher.stop()
+    await asyncio.to_thread(NotificationService.shutdown)
 
 
 # Auth Endpoints
@@ -52,7 +86,8 @@ async def google_auth(request: dict, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Token missing")
     
     print("DEBUG: google_auth verifying token...")
-    user_info = AuthService.verify_google_token(token)
+    # Cert fetches (rare, cached) block, so keep verification off the event loop
+    user_info = await asyncio.to_thread(AuthService.verify_google_token, token)
     print(f"DEBUG: google_auth user_info: {user_info}")
     
     # Check if user exists
@@ -98,63 +133,55 @@ async def google_auth(request: dict, db: AsyncSession = Depends(get_db)):
     }
 
 @app.get("/api/auth/me")
-async def get_me(authorization: str = Header(None), db: AsyncSession = Depends(get_db)):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    payload = AuthService.decode_access_token(authorization)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    stmt = select(User).where(User.id == payload["id"])
-    result = await db.execute(stmt)
-    user = result.scalars().first()
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
+async def get_me(user: UserContext = Depends(get_current_user)):
+    # Served from the user context cache; no DB round trip on repeat calls
     return {
         "email": user.email,
-        "name": user.full_name,
-        "picture": user.profile_pic
+        "name": user.name,
+        "picture": user.picture
     }
 
 @app.get("/api/pantry", response_model=List[PantryItemResponse])
-async def get_pantry(authorization: str = Header(None), db: AsyncSession = Depends(get_db)):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    payload = AuthService.decode_access_token(authorization)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    stmt = select(PantryItem).where(PantryItem.user_id == payload["id"]).order_by(PantryItem.scan_date.desc())
+async def get_pantry(
+    response: Response,
+    expiring_within: Optional[int] = Query(None, ge=0, description="Only items expiring within this many days, soonest first"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    payload: dict = Depends(require_token_payload),
+    db: AsyncSession = Depends(get_db)
+):
+    now = datetime.utcnow()
+    stmt, sort_attr = pantry_query(payload["id"], now, expiring_within, cursor, limit)
     result = await db.execute(stmt)
-    items = result.scalars().all()
+    items = next_page(result.scalars().all(), response, limit, sort_attr)
     
-    return [
-        PantryItemResponse(
+    responses = []
+    for item in items:
+        # Remaining days are derived from expires_at, so they count down
+        days = days_remaining(item.expires_at, now) if item.expires_at else item.days_until_expiry
+        responses.append(PantryItemResponse(
             id=item.id,
             ingredient_name=item.ingredient_name,
             scan_date=item.scan_date.isoformat(),
-            days_until_expiry=item.days_until_expiry,
-            urgency=item.urgency,
+            expires_at=item.expires_at.isoformat() if item.expires_at else None,
+            days_until_expiry=days,
+            urgency=urgency_for(days) if item.expires_at else item.urgency,
             storage=item.storage
-        ) for item in items
-    ]
+        ))
+    return responses
 
 @app.get("/api/recipes/history", response_model=List[SavedRecipeResponse])
-async def get_recipe_history(authorization: str = Header(None), db: AsyncSession = Depends(get_db)):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    payload = AuthService.decode_access_token(authorization)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    stmt = select(SavedRecipe).where(SavedRecipe.user_id == payload["id"]).order_by(SavedRecipe.saved_at.desc())
+async def get_recipe_history(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    include_guide: bool = Query(False, description="Include the full accessible_guide Markdown"),
+    payload: dict = Depends(require_token_payload),
+    db: AsyncSession = Depends(get_db)
+):
+    stmt = recipe_history_query(payload["id"], cursor, limit, include_guide)
     result = await db.execute(stmt)
-    recipes = result.scalars().all()
+    recipes = next_page(result.all(), response, limit, "saved_at")
     
     return [
         SavedRecipeResponse(
@@ -163,41 +190,33 @@ async def get_recipe_history(authorization: str = Header(None), db: AsyncSession
             ingredients=r.ingredients,
             video_url=r.video_url,
             thumbnail=r.thumbnail,
-            accessible_guide=r.accessible_guide,
+            accessible_guide=(GuideStore.decompress(r.guide_body) or r.accessible_guide) if include_guide else None,
             saved_at=r.saved_at.isoformat()
         ) for r in recipes
     ]
 
 @app.post("/api/recipes/save")
-async def save_recipe(request: SaveRecipeRequest, authorization: str = Header(None), db: AsyncSession = Depends(get_db)):
-    print(f"DEBUG: save_recipe endpoint reached. Authorization header received: {authorization[:20] if authorization else 'None'}...")
-    if not authorization:
-        print("DEBUG: save_recipe failed: No Authorization header found")
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
+async def save_recipe(request: SaveRecipeRequest, payload: dict = Depends(require_token_payload), db: AsyncSession = Depends(get_db)):
+    user_id = payload["id"]
     try:
-        payload = AuthService.decode_access_token(authorization)
-        print(f"DEBUG: Decoded payload in save_recipe: {payload}")
-        if not payload:
-            print("DEBUG: save_recipe failed: Token decoding returned None")
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user_id = payload.get("id")
-        if not user_id:
-            print("DEBUG: save_recipe failed: 'id' key missing in payload")
-            raise HTTPException(status_code=401, detail="Invalid token: no user_id")
+        # Identical guides (same video, same generation) are stored once, compressed
+        guide_id = None
+        if request.accessible_guide:
+            guide_id = await GuideStore.save(db, request.accessible_guide, request.video_url)
 
         print(f"DEBUG: Constructing SavedRecipe object for {request.recipe_name}")
         recipe = SavedRecipe(
             user_id=user_id,
             recipe_name=request.recipe_name,
-            ingredients=request.ingredients,
+            ingredients=canonicalize_all(request.ingredients),
             video_url=request.video_url,
             thumbnail=request.thumbnail,
-            accessible_guide=request.accessible_guide
+            guide_id=guide_id
         )
         db.add(recipe)
         await db.commit()
+        # Recent recipes feed suggest_recipes; drop the cached context
+        invalidate_user_context(user_id)
         print(f"DEBUG: Database commit SUCCESS for recipe: {request.recipe_name}")
         return {"message": "Recipe saved successfully"}
     except Exception as e:
@@ -207,78 +226,112 @@ async def save_recipe(request: SaveRecipeRequest, authorization: str = Header(No
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+async def _save_pantry_items(db: AsyncSession, user_id: int, ingredients: list[str], expiry_info: dict):
+    """
+    Upserts scanned items in one statement keyed by (user_id, ingredient_name):
+    items already in the pantry get a fresh scan_date and expiry, new ones
+    are inserted. `ingredients` must be canonical and deduplicated.
+    """
+    if not ingredients:
+        return
+    now = datetime.utcnow()
+    rows = []
+    for ing in ingredients:
+        expiry = expiry_info.get(ing, {"days": 7, "urgency": "medium", "storage": "pantry"})
+        rows.append({
+            "user_id": user_id,
+            "ingredient_name": ing,
+            "scan_date": now,
+            "days_until_expiry": expiry["days"],
+            "expires_at": now + timedelta(days=expiry["days"]),
+            "urgency": expiry["urgency"],
+            "storage": expiry["storage"]
+        })
+    stmt = dialect_insert(db, PantryItem).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "ingredient_name"],
+        set_={col: stmt.excluded[col] for col in ("scan_date", "days_until_expiry", "expires_at", "urgency", "storage")}
+    )
+    await db.execute(stmt)
+    await db.commit()
+    print(f"💾 Upserted {len(rows)} items for user {user_id}")
+
 @app.post("/api/analyze-pantry", response_model=PantryAnalysisResponse)
-async def analyze_pantry(file: UploadFile = File(...), authorization: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)):
+async def analyze_pantry(file: UploadFile = File(...), payload: Optional[dict] = Depends(get_token_payload), db: AsyncSession = Depends(get_db)):
     try:
-        # Save temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
-        
+        # Who is scanning (also keys the speculative detection policy)
+        user_id = payload.get("id") if payload else None
+        print(f"DEBUG: analyze_pantry user_id: {user_id}")
+
         # Analyze
         try:
-            ingredients = VisionService.analyze_image(tmp_path)
-            
-            # Estimate expiry dates using LLM
-            print(f"📅 Estimating expiry dates for {len(ingredients)} ingredients...")
-            expiry_info = agent_service.estimate_expiry_dates(ingredients)
-            
-            # If authenticated, save to database
-            if authorization:
-                print(f"DEBUG: analyze_pantry checking token...")
-                payload = AuthService.decode_access_token(authorization)
-                if payload:
-                    user_id = payload.get("id")
-                    print(f"DEBUG: analyze_pantry user_id: {user_id}")
-                    if user_id:
-                        for ing in ingredients:
-                            expiry = expiry_info.get(ing, {"days": 7, "urgency": "medium", "storage": "pantry"})
-                            item = PantryItem(
-                                user_id=user_id,
-                                ingredient_name=ing,
-                                days_until_expiry=expiry["days"],
-                                urgency=expiry["urgency"],
-                                storage=expiry["storage"]
-                            )
-                            db.add(item)
-                        await db.commit()
-                        print(f"💾 Saved {len(ingredients)} items to database for user {user_id}")
-                    else:
-                        print("DEBUG: user_id missing from payload in analyze_pantry")
-                else:
-                    print("DEBUG: Token decode failed in analyze_pantry")
-            else:
-                print("DEBUG: No token header in analyze_pantry - skipping DB save")
-            
-        finally:
-            os.remove(tmp_path)
+            ingredients = await pantry_scanner.scan(await file.read(), user_id)
+        except RetakeRequired as e:
+            raise HTTPException(status_code=422, detail=e.detail)
+        except ValueError as e:
+            # Not a decodable image
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Estimate expiry dates (shelf-life table first, LLM for the rest)
+        print(f"📅 Estimating expiry dates for {len(ingredients)} ingredients...")
+        expiry_info = await shelf_life_service.aestimate(ingredients, agent_service)
+        
+        # If authenticated, save to database
+        if user_id:
+            await _save_pantry_items(db, user_id, ingredients, expiry_info)
+        else:
+            print("DEBUG: No valid token in analyze_pantry - skipping DB save")
             
         return PantryAnalysisResponse(ingredients=ingredients, expiry_info=expiry_info)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/analyze-pantry/batch", response_model=BatchPantryAnalysisResponse)
+async def analyze_pantry_batch(files: List[UploadFile] = File(...), payload: Optional[dict] = Depends(get_token_payload), db: AsyncSession = Depends(get_db)):
+    """
+    Scans several images at once (fridge, freezer, shelf, receipt...).
+    Vision runs concurrently per image; the merged ingredient list gets a
+    single expiry estimation and a single DB transaction.
+    """
+    if len(files) > MAX_BATCH_IMAGES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IMAGES} images per batch")
+    try:
+        user_id = payload.get("id") if payload else None
+        print(f"DEBUG: analyze_pantry_batch user_id: {user_id}, images: {len(files)}")
+
+        uploads = [(f.filename, await f.read()) for f in files]
+        images = await pantry_scanner.scan_many(uploads, user_id)
+        ingredients = canonicalize_all(ing for image in images for ing in image["ingredients"])
+
+        print(f"📅 Estimating expiry dates for {len(ingredients)} ingredients across {len(files)} images...")
+        expiry_info = await shelf_life_service.aestimate(ingredients, agent_service) if ingredients else {}
+
+        if user_id and ingredients:
+            await _save_pantry_items(db, user_id, ingredients, expiry_info)
+
+        return BatchPantryAnalysisResponse(
+            ingredients=ingredients,
+            expiry_info=expiry_info,
+            images=[ImageScanResult(**image) for image in images]
+        )
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/suggest-recipes", response_model=RecipeSuggestionResponse)
-async def suggest_recipes(request: RecipeSuggestionRequest, authorization: str = Header(None), db: AsyncSession = Depends(get_db)):
-    print(f"DEBUG: suggest_recipes called. Authorization present: {authorization is not None}")
+async def suggest_recipes(request: RecipeSuggestionRequest, user: Optional[UserContext] = Depends(get_optional_user)):
     try:
-        saved_names = []
-        if authorization:
-            payload = AuthService.decode_access_token(authorization)
-            if payload:
-                user_id = payload.get("id")
-                print(f"DEBUG: suggest_recipes user_id: {user_id}")
-                if user_id:
-                    # Fetch recent 5 saved recipes to understand style
-                    stmt = select(SavedRecipe.recipe_name).where(SavedRecipe.user_id == user_id).order_by(SavedRecipe.saved_at.desc()).limit(5)
-                    result = await db.execute(stmt)
-                    saved_names = [r for r in result.scalars().all()]
-                    print(f"DEBUG: Suggesting based on {len(saved_names)} saved recipes: {saved_names}")
-                else:
-                    print("DEBUG: suggest_recipes: user_id missing in token")
-            else:
-                print("DEBUG: suggest_recipes: Token decode failed")
+        # Recent saved recipes hint at the user's style (cached per user)
+        saved_names = user.recent_recipes if user else []
+        if user:
+            print(f"DEBUG: Suggesting based on {len(saved_names)} saved recipes: {saved_names}")
 
-        recipes = agent_service.brainstorm_recipes(request.ingredients, request.preferences, saved_recipes=saved_names)
+        ingredients = canonicalize_all(request.ingredients)
+        recipes = await agent_service.abrainstorm_recipes(ingredients, request.preferences, saved_recipes=saved_names)
         return RecipeSuggestionResponse(recipes=recipes)
     except Exception as e:
         print(f"DEBUG: EXCEPTION in suggest_recipes: {str(e)}")
@@ -292,30 +345,20 @@ async def find_videos(request: VideoSearchRequest):
     The 'Magic' orchestration endpoint.
     """
     try:
-        results = []
-        
         # 1. Query Engineer Agent
         channel_filter = request.filters.channel if request.filters else None
         cuisine_filter = request.filters.cuisine if request.filters else None
         
-        queries = agent_service.generate_search_queries(
+        queries = await agent_service.agenerate_search_queries(
             request.selected_recipe, 
             channel_filter, 
             cuisine_filter
         )
         print(f"🕵️‍♀️ Generated Queries: {queries}")
         
-        # 2. Search Executor (Run all queries and deduct duplicates)
-        seen_ids = set()
-        raw_videos = []
-        
-        for q in queries:
-            # OPTIMIZATION: Limit to 2 results per query to speed up processing
-            videos = search_service.search_youtube_videos(q, max_results=2)
-            for v in videos:
-                if v['id'] not in seen_ids:
-                    seen_ids.add(v['id'])
-                    raw_videos.append(v)
+        # 2. Search Executor (Run all queries concurrently and dedupe)
+        # OPTIMIZATION: Limit to 2 results per query to speed up processing
+        raw_videos = await video_pipeline.search(queries, max_results=2)
         
         print(f"🔎 Found {len(raw_videos)} raw videos. Verifying...")
         
@@ -323,83 +366,20 @@ async def find_videos(request: VideoSearchRequest):
         raw_videos = raw_videos[:3]
         print(f"⚡ Processing {len(raw_videos)} videos...")
 
-        # 3. Verification & Scoring (First Pass)
-        candidates = []
-        
-        for idx, video in enumerate(raw_videos, 1):
-            print(f"   [{idx}/{len(raw_videos)}] Checking: {video['title'][:60]}...")
-            # Fetch content (Transcript > Description)
-            transcript = search_service.get_video_transcript(video['id'])
-            description = video['description']
-            content_for_llm = transcript if transcript else description
-            source_type = "transcript" if transcript else "description"
-            
-            # VERIFICATION TEMPORARILY DISABLED - Ollama JSON parsing issues
-            # verification = agent_service.verify_video(
-            #     video['title'], content_for_llm, 
-            #     request.selected_recipe, request.ingredients
-            # )
-            
-            # For now, accept all videos with a default confidence
-            verification = {
-                "valid": True, 
-                "reason": "Verification disabled - accepting all results",
-                "confidence_score": 70  # Default confidence
-            }
-            
-            if verification.get('valid'):
-                # calculate smart score
-                stats = search_service.get_video_stats(video['id'])
-                views = int(stats.get('viewCount', 0)) if stats else 0
-                
-                # Normalize views (log scale primitive approximation)
-                # Cap at 1M for normalization 1.0
-                norm_views = min(views / 1_000_000, 1.0)
-                
-                # Channel similarity (simple check)
-                channel_score = 1.0 if channel_filter and channel_filter.lower() in video['channel'].lower() else 0.0
-                
-                conf_score = float(verification.get('confidence_score', 50)) / 100.0
-                
-                # Weighted Score
-                # Relevance (0.5) + Views (0.3) + Channel (0.2)
-                smart_score = (conf_score * 50) + (norm_views * 30) + (channel_score * 20)
-                
-                # Store candidate (defer guide generation)
-                candidates.append({
-                    "data": video,
-                    "score": smart_score,
-                    "reason": verification.get('reason'),
-                    "views": views,
-                    "content_for_llm": content_for_llm, 
-                    "source_type": source_type
-                })
+        # 3. Verification & Scoring (transcript + stats fetched concurrently)
+        candidates = await video_pipeline.score(raw_videos, channel_filter)
 
         # 4. Sort and Slice
-        candidates.sort(key=lambda x: x['score'], reverse=True)
-        top_candidates = candidates[:3] # process only top 3
+        top_candidates = video_pipeline.rank(candidates, top_n=3) # process only top 3
 
-        # 5. Guide Generation (Second Pass - Parallelizable in theory, serial here but fewer items)
-        final_results = []
+        # 5. Guide Generation (concurrent across the top candidates)
         print(f"📝 Generating guides for top {len(top_candidates)} videos...")
+        guides = await video_pipeline.generate_guides(top_candidates)
         
-        for c in top_candidates:
-            guide = agent_service.generate_accessible_guide(
-                c['data']['title'], 
-                c['content_for_llm'], 
-                c['source_type']
-            )
-            
-            final_results.append(VideoResult(
-                title=c['data']['title'],
-                url=c['data']['url'],
-                thumbnail=c['data']['thumbnail'],
-                channel=c['data']['channel'],
-                views=str(c['views']),
-                smart_score=round(c['score'], 1),
-                accessible_guide=guide,
-                match_reason=c['reason']
-            ))
+        final_results = [
+            video_pipeline.to_result(c, guide)
+            for c, guide in zip(top_candidates, guides)
+        ]
         
         print(f"✅ Returning {len(final_results)} verified videos to frontend")
         return VideoSearchResponse(videos=final_results)
@@ -410,6 +390,60 @@ async def find_videos(request: VideoSearchRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/find-videos/stream")
+async def find_videos_stream(request: VideoSearchRequest):
+    """
+    Streaming variant of /api/find-videos (Server-Sent Events).
+    Emits a `video` event per scored result (without its guide), then
+    `guide` events carrying token deltas for each result as they are
+    generated, `guide_done`/`guide_error` per result and a final `done`.
+    """
+    async def event_stream():
+        try:
+            channel_filter = request.filters.channel if request.filters else None
+            cuisine_filter = request.filters.cuisine if request.filters else None
+
+            queries = await agent_service.agenerate_search_queries(
+                request.selected_recipe,
+                channel_filter,
+                cuisine_filter
+            )
+            print(f"🕵️‍♀️ Generated Queries: {queries}")
+
+            raw_videos = (await video_pipeline.search(queries, max_results=2))[:3]
+            candidates = await video_pipeline.score(raw_videos, channel_filter)
+            top_candidates = video_pipeline.rank(candidates, top_n=3)
+
+            for index, c in enumerate(top_candidates):
+                yield _sse("video", {"index": index, "video": jsonable_encoder(video_pipeline.to_result(c))})
+
+            async for index, kind, text in video_pipeline.stream_guides(top_candidates):
+                if kind == "delta":
+                    yield _sse("guide", {"index": index, "delta": text})
+                elif kind == "done":
+                    yield _sse("guide_done", {"index": index})
+                else:
+                    yield _sse("guide_error", {"index": index, "detail": text})
+
+            yield _sse("done", {"count": len(top_candidates)})
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Serve as `uvicorn app:app` does. Preprocess workers are spawned and
+    # re-import __main__; if that were this file, every worker would rebuild
+    # the services above.
+    import os
+    import sys
+    os.execv(sys.executable, [sys.executable, "-m", "uvicorn", "app:app", "--host", "0.0.0.0", "--port", "8000"])
@@ -0,0 +1,107 @@
+"""
+Times the daily expiry check on a throwaway SQLite database.
+
+    cd backend
+    python -m benchmarks.expiry_check --users 10000 100000
+
+Compares the old per-user query loop (N+1 on days_until_expiry) with the
+streamed join on expires_at in tasks.scheduler. The old loop's
+notifications are counted, not sent; the new job writes its digests to the
+notification outbox as it would in production.
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from database import Base, configure_sqlite
+from models.db_models import User, PantryItem
+from tasks.scheduler import check_expiring_ingredients, EXPIRY_WARNING_DAYS
+
+ITEMS_PER_USER = 8
+INSERT_BATCH = 5000
+
+async def seed(engine, users: int):
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for start in range(0, users, INSERT_BATCH):
+            ids = range(start + 1, min(start + INSERT_BATCH, users) + 1)
+            await conn.execute(insert(User), [
+                {"id": i, "email": f"user{i}@example.com", "full_name": f"User {i}", "google_id": f"g{i}"}
+                for i in ids
+            ])
+            items = []
+            for i in ids:
+                for n in range(ITEMS_PER_USER):
+                    days = rng.randint(0, 14)
+                    items.append({
+                        "user_id": i,
+                        "ingredient_name": f"item {n}",
+                        "scan_date": now,
+                        "days_until_expiry": days,
+                        "expires_at": now + timedelta(days=days),
+                        "urgency": "high",
+                        "storage": "refrigerate"
+                    })
+            await conn.execute(insert(PantryItem), items)
+
+async def legacy_check(session_factory, dispatch) -> int:
+    """The original implementation: one PantryItem query per user."""
+    notified = 0
+    async with session_factory() as db:
+        users = (await db.execute(select(User))).scalars().all()
+        for user in users:
+            stmt = select(PantryItem).where(
+                PantryItem.user_id == user.id,
+                PantryItem.days_until_expiry <= EXPIRY_WARNING_DAYS
+            )
+            items = (await db.execute(stmt)).scalars().all()
+            if items:
+                await dispatch(user.email, user.full_name, [{"name": i.ingredient_name} for i in items])
+                notified += 1
+    return notified
+
+async def run(users: int, chunk_size: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        configure_sqlite(engine)
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        t0 = time.perf_counter()
+        await seed(engine, users)
+        print(f"🌱 Seeded {users} users x {ITEMS_PER_USER} items in {time.perf_counter() - t0:.1f}s")
+
+        async def dispatch(email, name, items):
+            pass
+
+        t0 = time.perf_counter()
+        legacy = await legacy_check(session_factory, dispatch)
+        legacy_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        streamed = await check_expiring_ingredients(session_factory, chunk_size)
+        streamed_s = time.perf_counter() - t0
+
+        assert legacy == streamed, (legacy, streamed)
+        print(f"⏱️ {users} users: per-user queries {legacy_s:.2f}s, streamed join {streamed_s:.2f}s "
+              f"({legacy_s / streamed_s:.1f}x), {streamed} digests enqueued")
+        await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    for users in args.users:
+        asyncio.run(run(users, args.chunk_size))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Exercises GoogleTokenVerifier against a local cert server instead of Google.
+
+    cd backend
+    python -m benchmarks.google_certs --logins 2000 --max-age 2
+
+Serves a self-signed signing cert with a Cache-Control max-age, signs ID
+tokens with its key and verifies them from several threads. Reports the
+verify latency and how often the certs were fetched: one cold fetch plus one
+background refresh per max-age window, and one forced refresh after the key
+is rotated mid-run.
+"""
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from google.auth import crypt, jwt as google_jwt
+from services.auth_service import GoogleTokenVerifier
+
+CLIENT_ID = "local-test-client"
+
+def make_key(kid: str):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, kid)])
+    now = datetime.utcnow()
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name)
+        .public_key(key.public_key()).serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode()
+    return crypt.RSASigner.from_string(key_pem, key_id=kid), cert_pem
+
+class CertServer:
+    def __init__(self, max_age: int):
+        self.max_age = max_age
+        self.certs = {}
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                body = json.dumps(server.certs).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={server.max_age}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/certs"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+def id_token(signer) -> bytes:
+    now = int(time.time())
+    return google_jwt.encode(signer, {
+        "iss": "https://accounts.google.com", "aud": CLIENT_ID, "sub": "123",
+        "email": "user@example.com", "iat": now, "exp": now + 3600
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--max-age", type=int, default=2)
+    args = parser.parse_args()
+
+    server = CertServer(args.max_age)
+    signer, cert = make_key("key-1")
+    server.certs = {"key-1": cert}
+    verifier = GoogleTokenVerifier(certs_url=server.url, client_id=CLIENT_ID)
+    token = id_token(signer)
+
+    def login(_):
+        started = time.perf_counter()
+        verifier.verify(token)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        t0 = time.perf_counter()
+        latencies = sorted(pool.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - t0
+    print(f"🔑 {args.logins} logins in {elapsed:.2f}s, p50 {latencies[len(latencies) // 2] * 1000:.2f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms, cert fetches {server.requests}")
+
+    # Rotation: a token signed by a key the cache hasn't seen yet forces one refresh
+    new_signer, new_cert = make_key("key-2")
+    server.certs = {"key-1": cert, "key-2": new_cert}
+    before = server.requests
+    verifier.verify(id_token(new_signer))
+    print(f"🔄 Rotated key verified after {server.requests - before} refresh(es)")
+    server.httpd.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Prints SQLite's EXPLAIN QUERY PLAN for the hot queries checked by
+tests/test_query_plans.py, on an empty schema.
+
+    cd backend
+    python -m benchmarks.query_plans
+
+Exits non-zero if any plan regresses; the same checks run under pytest.
+"""
+import sys
+from sqlalchemy import create_engine
+from database import Base
+from tests.test_query_plans import CHECKS, explain, check
+
+def main() -> int:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    failures = 0
+    with engine.connect() as conn:
+        for name, (stmt, indexes, sorted_by_index) in CHECKS.items():
+            plan = explain(conn, stmt)
+            problems = check(plan, indexes, sorted_by_index)
+            print(f"{'✅' if not problems else '❌'} {name}")
+            for step in plan:
+                print(f"     {step}")
+            for problem in problems:
+                print(f"   ⚠️ {problem}")
+            failures += bool(problems)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
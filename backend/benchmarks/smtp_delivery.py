@@ -0,0 +1,71 @@
+"""
+Sends a burst of expiry digests through the pooled delivery engine to a
+local aiosmtpd server and reports throughput.
+
+    pip install aiosmtpd
+    cd backend
+    python -m benchmarks.smtp_delivery --messages 1000 --pool-size 4 --rate 0
+
+Every message must arrive exactly once; the sink can also be told to
+reject the first attempt of some messages with a 421 to exercise retries.
+"""
+import time
+import asyncio
+import argparse
+import threading
+from aiosmtpd.controller import Controller
+from services.notification_service import (
+    NotificationService, EmailDeliveryEngine, SmtpConnectionPool
+)
+
+class CountingHandler:
+    def __init__(self, fail_every: int = 0):
+        self.fail_every = fail_every
+        self.received = {}
+        self._attempts = 0
+        self._lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self._attempts += 1
+            if self.fail_every and self._attempts % self.fail_every == 0:
+                return "421 Try again later"
+            for rcpt in envelope.rcpt_tos:
+                self.received[rcpt] = self.received.get(rcpt, 0) + 1
+        return "250 OK"
+
+async def run(messages: int, pool_size: int, rate: float, fail_every: int):
+    handler = CountingHandler(fail_every)
+    controller = Controller(handler, hostname="127.0.0.1", port=8025)
+    controller.start()
+    pool = SmtpConnectionPool(host="127.0.0.1", port=8025, security="none", user=None, password=None, size=pool_size)
+    engine = EmailDeliveryEngine(pool, rate=rate, backoff=0.05)
+    items = [{"name": "milk", "days": 1, "urgency": "high", "storage": "refrigerate"}]
+    try:
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*[
+            engine.asend("bench@example.com", f"user{i}@example.com",
+                         NotificationService.build_expiry_email(f"user{i}@example.com", f"User {i}", items).as_string())
+            for i in range(messages)
+        ])
+        elapsed = time.perf_counter() - t0
+    finally:
+        engine.close()
+        controller.stop()
+
+    delivered = sum(results)
+    duplicates = sum(1 for n in handler.received.values() if n > 1)
+    print(f"📧 {delivered}/{messages} delivered in {elapsed:.2f}s ({messages / elapsed:.0f} msg/s), "
+          f"pool={pool_size}, rate={rate or 'unlimited'}, duplicates={duplicates}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=0, help="messages per second, 0 = unlimited")
+    parser.add_argument("--fail-every", type=int, default=0, help="reject every Nth DATA with a 421")
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.pool_size, args.rate, args.fail_every))
+
+if __name__ == "__main__":
+    main()
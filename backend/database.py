@@ -1,18 +1,136 @@
+from sqlalchemy import event, inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
 # Using SQLite for simplicity in development, can be easily switched to PostgreSQL
-DATABASE_URL = "sqlite+aiosqlite:///./recipe_genie.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./recipe_genie.db")
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# Applied to every new SQLite connection. WAL lets API reads run alongside
+# the single writer (scheduler, outbox, scans); with WAL, NORMAL sync only
+# risks the last transactions on power loss, never corruption.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # negative = KiB, so 64 MiB per connection
+    "temp_store": "MEMORY",
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT", "5000"),  # ms to wait on a lock instead of failing
+}
+
+def configure_sqlite(async_engine):
+    """Registers the SQLITE_PRAGMAS connect hook on an engine (no-op for other backends)."""
+    if async_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+engine = create_async_engine(DATABASE_URL, echo=DB_ECHO)
+configure_sqlite(engine)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
+def dialect_insert(db, model):
+    """INSERT construct with ON CONFLICT support for the backend (SQLite or PostgreSQL) of a session or connection."""
+    dialect = db.dialect if hasattr(db, "dialect") else db.bind.dialect
+    if dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
 
+def _migrate(conn):
+    """
+    Small in-place upgrades for databases created by older versions;
+    create_all only creates missing tables, not missing columns or indexes.
+    """
+    columns = {c["name"] for c in inspect(conn).get_columns("pantry_items")}
+    if "expires_at" not in columns:
+        print("🛠️ Adding pantry_items.expires_at and backfilling it...")
+        conn.execute(text("ALTER TABLE pantry_items ADD COLUMN expires_at DATETIME"))
+        conn.execute(text(
+            "UPDATE pantry_items "
+            # Same text format SQLAlchemy writes, so range and keyset comparisons line up
+            "SET expires_at = datetime(scan_date, '+' || days_until_expiry || ' days') || '.000000' "
+            "WHERE expires_at IS NULL AND scan_date IS NOT NULL AND days_until_expiry IS NOT NULL"
+        ))
+    indexes = {i["name"] for i in inspect(conn).get_indexes("pantry_items")}
+    if "uq_pantry_items_user_ingredient" not in indexes:
+        _canonicalize_pantry_names(conn)
+    columns = {c["name"] for c in inspect(conn).get_columns("saved_recipes")}
+    if "guide_id" not in columns:
+        print("🛠️ Adding saved_recipes.guide_id...")
+        conn.execute(text("ALTER TABLE saved_recipes ADD COLUMN guide_id INTEGER REFERENCES recipe_guides(id)"))
+    _move_inline_guides(conn)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+def _canonicalize_pantry_names(conn):
+    """
+    Rewrites legacy pantry_items names to their canonical form, the key scans
+    upsert on, keeping only the newest row per (user, canonical name). Scans
+    used to append raw names ("bag of baby carrots") on every run.
+    """
+    from services.ingredient_canon import canonicalize
+
+    print("🛠️ Canonicalizing pantry item names before adding the unique index...")
+    # Oldest first, so the newest row per key is the one left in `newest`
+    rows = conn.execute(text(
+        "SELECT id, user_id, ingredient_name FROM pantry_items "
+        "ORDER BY CASE WHEN scan_date IS NULL THEN 0 ELSE 1 END, scan_date, id"
+    )).all()
+    newest = {}
+    for row in rows:
+        newest[(row.user_id, canonicalize(row.ingredient_name) or row.ingredient_name)] = row
+    keep_ids = {row.id for row in newest.values()}
+    stale = [{"id": row.id} for row in rows if row.id not in keep_ids]
+    if stale:
+        conn.execute(text("DELETE FROM pantry_items WHERE id = :id"), stale)
+    renamed = [{"id": row.id, "name": name} for (_, name), row in newest.items() if row.ingredient_name != name]
+    if renamed:
+        conn.execute(text("UPDATE pantry_items SET ingredient_name = :name WHERE id = :id"), renamed)
+    print(f"🛠️ Pantry items: {len(stale)} duplicates removed, {len(renamed)} names canonicalized")
+
+def _move_inline_guides(conn, batch_size: int = 500):
+    """Moves legacy saved_recipes.accessible_guide text into recipe_guides (deduplicated, compressed)."""
+    from services.guide_store import GuideStore
+
+    recipe_guides = Base.metadata.tables["recipe_guides"]
+    moved = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, video_url, accessible_guide FROM saved_recipes "
+            "WHERE accessible_guide IS NOT NULL AND guide_id IS NULL LIMIT :n"
+        ), {"n": batch_size}).all()
+        if not rows:
+            break
+        for recipe_id, video_url, markdown in rows:
+            guide_id = None
+            if markdown:
+                guide = GuideStore.row_for(markdown, video_url)
+                conn.execute(dialect_insert(conn, recipe_guides).values(**guide).on_conflict_do_nothing(index_elements=["content_hash"]))
+                guide_id = conn.execute(
+                    text("SELECT id FROM recipe_guides WHERE content_hash = :h"), {"h": guide["content_hash"]}
+                ).scalar_one()
+            conn.execute(
+                text("UPDATE saved_recipes SET guide_id = :g, accessible_guide = NULL WHERE id = :id"),
+                {"g": guide_id, "id": recipe_id}
+            )
+        moved += len(rows)
+    if moved:
+        print(f"🛠️ Moved {moved} inline guides into recipe_guides")
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_migrate)
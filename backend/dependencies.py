@@ -0,0 +1,95 @@
+import os
+import time
+import hashlib
+from typing import NamedTuple, Optional
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from dotenv import load_dotenv
+from database import get_db
+from models.db_models import User, SavedRecipe
+from services.auth_service import AuthService
+from services.cache import TTLCache
+
+load_dotenv()
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", "3600"))  # upper bound, tokens also expire at `exp`
+USER_CONTEXT_CACHE_SIZE = int(os.getenv("USER_CONTEXT_CACHE_SIZE", "1024"))
+USER_CONTEXT_CACHE_TTL = int(os.getenv("USER_CONTEXT_CACHE_TTL", "300"))
+RECENT_RECIPES_LIMIT = 5
+
+# sha256(token) -> verified payload
+token_cache = TTLCache(maxsize=AUTH_TOKEN_CACHE_SIZE, ttl=AUTH_TOKEN_CACHE_TTL)
+# user id -> UserContext
+user_context_cache = TTLCache(maxsize=USER_CONTEXT_CACHE_SIZE, ttl=USER_CONTEXT_CACHE_TTL)
+
+class UserContext(NamedTuple):
+    id: int
+    email: str
+    name: str
+    picture: str
+    recent_recipes: list  # names of the last RECENT_RECIPES_LIMIT saved recipes, newest first
+
+def verify_token(authorization: Optional[str]) -> Optional[dict]:
+    """Decodes a bearer token, reusing the result for repeat calls until the token's `exp`."""
+    if not authorization:
+        return None
+    token = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else authorization
+    key = hashlib.sha256(token.encode()).hexdigest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
+    payload = AuthService.decode_access_token(token)
+    if payload:
+        ttl = min(AUTH_TOKEN_CACHE_TTL, payload.get("exp", 0) - time.time())
+        if ttl > 0:
+            token_cache.set(key, payload, ttl=ttl)
+    return payload
+
+async def get_token_payload(authorization: Optional[str] = Header(None)) -> Optional[dict]:
+    """Optional auth: the verified payload, or None for anonymous or invalid tokens."""
+    return verify_token(authorization)
+
+async def require_token_payload(authorization: Optional[str] = Header(None), payload: Optional[dict] = Depends(get_token_payload)) -> dict:
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if not payload or not payload.get("id"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+async def load_user_context(user_id: int, db: AsyncSession) -> Optional[UserContext]:
+    context = user_context_cache.get(user_id)
+    if context is not None:
+        return context
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalars().first()
+    if not user:
+        return None
+    stmt = (
+        select(SavedRecipe.recipe_name)
+        .where(SavedRecipe.user_id == user_id)
+        .order_by(SavedRecipe.saved_at.desc(), SavedRecipe.id.desc())
+        .limit(RECENT_RECIPES_LIMIT)
+    )
+    recent = (await db.execute(stmt)).scalars().all()
+    context = UserContext(user.id, user.email, user.full_name, user.profile_pic, list(recent))
+    user_context_cache.set(user_id, context)
+    return context
+
+def invalidate_user_context(user_id: int):
+    """Call after writes that change a user's context (e.g. saving a recipe)."""
+    user_context_cache.pop(user_id)
+
+async def get_current_user(payload: dict = Depends(require_token_payload), db: AsyncSession = Depends(get_db)) -> UserContext:
+    context = await load_user_context(payload["id"], db)
+    if context is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return context
+
+async def get_optional_user(payload: Optional[dict] = Depends(get_token_payload), db: AsyncSession = Depends(get_db)) -> Optional[UserContext]:
+    if not payload or not payload.get("id"):
+        return None
+    return await load_user_context(payload["id"], db)
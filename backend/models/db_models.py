@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index, Text, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -23,12 +23,19 @@ class PantryItem(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     ingredient_name = Column(String, index=True)
     scan_date = Column(DateTime, default=datetime.utcnow)
-    days_until_expiry = Column(Integer)
+    days_until_expiry = Column(Integer) # as estimated at scan time
+    expires_at = Column(DateTime, index=True) # scan_date + days_until_expiry
     urgency = Column(String) # high, medium, low
     storage = Column(String) # refrigerate, pantry, freezer
     
     user = relationship("User", back_populates="pantry_items")
 
+    __table_args__ = (
+        Index("ix_pantry_items_user_scan", "user_id", "scan_date"), # /api/pantry
+        Index("ix_pantry_items_user_expires", "user_id", "expires_at"), # expiring_within, expiry job
+        Index("uq_pantry_items_user_ingredient", "user_id", "ingredient_name", unique=True), # scan upserts
+    )
+
 class SavedRecipe(Base):
     __tablename__ = "saved_recipes"
 
@@ -38,7 +45,45 @@ class SavedRecipe(Base):
     ingredients = Column(JSON) # List of ingredients used
     video_url = Column(String)
     thumbnail = Column(String)
-    accessible_guide = Column(String)
+    accessible_guide = Column(String) # legacy inline copy, moved to recipe_guides by init_db
+    guide_id = Column(Integer, ForeignKey("recipe_guides.id"))
     saved_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="saved_recipes")
+    guide = relationship("RecipeGuide")
+
+    __table_args__ = (
+        Index("ix_saved_recipes_user_saved", "user_id", "saved_at"), # /api/recipes/history
+    )
+
+class RecipeGuide(Base):
+    __tablename__ = "recipe_guides"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String, unique=True, nullable=False) # sha256 of the Markdown
+    video_url = Column(String, index=True)
+    body = Column(LargeBinary, nullable=False) # zlib-compressed Markdown
+    size = Column(Integer) # uncompressed length
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String, unique=True, nullable=False) # e.g. expiry:<user_id>:<date>
+    user_id = Column(Integer, ForeignKey("users.id"))
+    kind = Column(String, nullable=False) # expiry_digest
+    recipient = Column(String, nullable=False)
+    payload = Column(JSON) # template arguments
+    status = Column(String, nullable=False, default="pending") # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    lease_token = Column(String) # set while a dispatcher owns the row
+    locked_until = Column(DateTime)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_notification_outbox_status_next", "status", "next_attempt_at"),
+    )
@@ -0,0 +1,71 @@
+import json
+import base64
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.future import select
+from models.db_models import PantryItem, SavedRecipe, RecipeGuide
+
+# Statement builders shared by the API and tests/test_query_plans.py, so the
+# plans checked there are the ones actually served.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Opaque keyset cursor: the last row's (sort column, id)."""
+    raw = json.dumps([sort_value.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(stmt, sort_column, id_column, cursor: Optional[str], limit: int, descending: bool):
+    """Applies keyset ordering on (sort_column, id), the cursor position and limit + 1 (to detect a next page)."""
+    if cursor:
+        key = tuple_(sort_column, id_column)
+        position = tuple_(*decode_cursor(cursor))
+        stmt = stmt.where(key < position if descending else key > position)
+    if descending:
+        stmt = stmt.order_by(sort_column.desc(), id_column.desc())
+    else:
+        stmt = stmt.order_by(sort_column, id_column)
+    return stmt.limit(limit + 1)
+
+def next_page(rows: list, response: Response, limit: int, sort_attr: str) -> list:
+    """Trims the look-ahead row and sets X-Next-Cursor when there is another page."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(getattr(last, sort_attr), last.id)
+    return rows
+
+def pantry_query(user_id: int, now: datetime, expiring_within: Optional[int], cursor: Optional[str], limit: int):
+    """GET /api/pantry. Returns (statement, attribute the cursor is built from)."""
+    stmt = select(PantryItem).where(PantryItem.user_id == user_id)
+    if expiring_within is not None:
+        # Range scan on (user_id, expires_at), soonest first
+        stmt = stmt.where(PantryItem.expires_at <= now + timedelta(days=expiring_within))
+        return paginate(stmt, PantryItem.expires_at, PantryItem.id, cursor, limit, descending=False), "expires_at"
+    # Newest first on (user_id, scan_date)
+    return paginate(stmt, PantryItem.scan_date, PantryItem.id, cursor, limit, descending=True), "scan_date"
+
+def recipe_history_query(user_id: int, cursor: Optional[str], limit: int, include_guide: bool):
+    """GET /api/recipes/history, newest first."""
+    # Summary projection: guides live in recipe_guides and are only joined when asked for
+    columns = [
+        SavedRecipe.id, SavedRecipe.recipe_name, SavedRecipe.ingredients,
+        SavedRecipe.video_url, SavedRecipe.thumbnail, SavedRecipe.saved_at
+    ]
+    if include_guide:
+        columns += [RecipeGuide.body.label("guide_body"), SavedRecipe.accessible_guide]
+    stmt = select(*columns).where(SavedRecipe.user_id == user_id)
+    if include_guide:
+        stmt = stmt.outerjoin(RecipeGuide, RecipeGuide.id == SavedRecipe.guide_id)
+    return paginate(stmt, SavedRecipe.saved_at, SavedRecipe.id, cursor, limit, descending=True)
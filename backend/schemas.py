@@ -13,6 +13,17 @@ class PantryAnalysisResponse(BaseModel):
     ingredients: List[str]
     expiry_info: Optional[dict] = None  # Maps ingredient name to expiry details
 
+class ImageScanResult(BaseModel):
+    filename: Optional[str] = None
+    ingredients: List[str]
+    retake: Optional[dict] = None  # Set when the photo failed the quality gate
+    error: Optional[str] = None  # Set when the image couldn't be read or scanned
+
+class BatchPantryAnalysisResponse(BaseModel):
+    ingredients: List[str]  # Canonical union across all images
+    expiry_info: Optional[dict] = None
+    images: List[ImageScanResult]
+
 class RecipeSuggestionRequest(BaseModel):
     ingredients: List[str]
     preferences: Optional[str] = "Quick and easy"
@@ -66,7 +77,8 @@ class PantryItemResponse(BaseModel):
     id: int
     ingredient_name: str
     scan_date: str
-    days_until_expiry: int
+    expires_at: Optional[str] = None
+    days_until_expiry: int  # remaining, computed at read time
     urgency: str
     storage: str
 
@@ -76,5 +88,5 @@ class SavedRecipeResponse(BaseModel):
     ingredients: List[str]
     video_url: str
     thumbnail: str
-    accessible_guide: Optional[str]
+    accessible_guide: Optional[str] = None  # Only with include_guide=true
     saved_at: str
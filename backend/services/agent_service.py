@@ -1,10 +1,12 @@
 import os
 import json
-from typing import Optional
+import time
+from typing import Optional, AsyncIterator
 from langchain_ollama import ChatOllama
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
+from services.llm_cache import LLMCache
+from services.llm_router import LLMRouter
 
 load_dotenv()
 
@@ -12,13 +14,16 @@ class AgentService:
     def __init__(self):
         # Try Ollama first, fallback to Gemini if it fails
         self.primary_llm = None
+        self.primary_model = "llama3.2"
         self.fallback_llms = []
+        self.temperature = 0.7
+        self.llm_cache = LLMCache()
         
         # Primary: Ollama (free, local)
         try:
             self.primary_llm = ChatOllama(
-                model="llama3.2",
-                temperature=0.7,
+                model=self.primary_model,
+                temperature=self.temperature,
                 base_url="http://localhost:11434",
                 timeout=5  # Quick timeout to detect if Ollama is down
             )
@@ -40,7 +45,7 @@ class AgentService:
                     llm = ChatGoogleGenerativeAI(
                         model=model,
                         api_key=gemini_key,
-                        temperature=0.7
+                        temperature=self.temperature
                     )
                     self.fallback_llms.append((model, llm))
                 except:
@@ -50,6 +55,19 @@ class AgentService:
         
         if not self.primary_llm and not self.fallback_llms:
             raise RuntimeError("No LLM available! Install Ollama or set GEMINI_API_KEY")
+
+        # Cache keys cover the whole model chain, since any of them may answer
+        chain = ([self.primary_model] if self.primary_llm else []) + [m for m, _ in self.fallback_llms]
+        self.model_signature = "|".join(chain)
+        self.router = LLMRouter(self._llm_chain())
+
+    def _llm_chain(self) -> list[tuple]:
+        """(name, llm) pairs in fallback order."""
+        chain = [(f"Ollama ({self.primary_model})", self.primary_llm)] if self.primary_llm else []
+        return chain + list(self.fallback_llms)
+
+    def _cache_key(self, prompt: str) -> str:
+        return LLMCache.make_key(prompt, self.model_signature, self.temperature)
     
     def _clean_and_parse_json(self, text: str) -> dict:
         """Helper to extract and parse JSON from LLM response."""
@@ -81,31 +99,105 @@ class AgentService:
             print(f"   Raw text: {text[:200]}...")
             return None
 
-    def _invoke_with_fallback(self, prompt: str) -> str:
-        """Try primary LLM first, then fallback to Gemini models."""
-        # Try Ollama first
-        if self.primary_llm:
+    def _cache_lookup(self, prompt: str, cache_method: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+        """Returns (cache key, cached text) — key is None when the method isn't cached."""
+        if self.llm_cache.ttl_for(cache_method) <= 0:
+            return None, None
+        key = self._cache_key(prompt)
+        cached = self.llm_cache.get(cache_method, key)
+        if cached is not None:
+            print(f"   ♻️ LLM cache hit ({cache_method})")
+        return key, cached
+
+    def _invoke_with_fallback(self, prompt: str, cache_method: Optional[str] = None) -> str:
+        """
+        Try primary LLM first, then fallback to Gemini models.
+        With `cache_method`, byte-identical prompts are answered from the
+        LLM cache for that method's TTL.
+        """
+        key, cached = self._cache_lookup(prompt, cache_method)
+        if cached is not None:
+            return cached
+        text = self._invoke_uncached(prompt)
+        if key:
+            self.llm_cache.set(cache_method, key, text)
+        return text
+
+    async def _ainvoke_with_fallback(self, prompt: str, cache_method: Optional[str] = None) -> str:
+        """Async counterpart of _invoke_with_fallback, built on ainvoke."""
+        key, cached = self._cache_lookup(prompt, cache_method)
+        if cached is not None:
+            return cached
+        text = await self._ainvoke_uncached(prompt)
+        if key:
+            self.llm_cache.set(cache_method, key, text)
+        return text
+
+    def _invoke_uncached(self, prompt: str) -> str:
+        """Walks the router's healthy backends until one answers."""
+        for provider in self.router.candidates():
+            started = time.monotonic()
             try:
-                response = self.primary_llm.invoke(prompt)
-                return response.content if hasattr(response, 'content') else str(response)
+                print(f"   Trying {provider.name}...")
+                response = provider.llm.invoke(prompt)
+                text = response.content if hasattr(response, 'content') else str(response)
             except Exception as e:
-                print(f"⚠️ Ollama failed: {e}, trying Gemini fallback...")
+                print(f"   ❌ {provider.name} failed: {str(e)[:100]}")
+                self.router.record_failure(provider)
+                continue
+            self.router.record_success(provider, time.monotonic() - started)
+            print(f"   ✅ Success with {provider.name}")
+            return text
         
-        # Try Gemini fallbacks
-        for model_name, llm in self.fallback_llms:
+        raise RuntimeError("All LLMs failed (Ollama + all Gemini models)")
+
+    async def _ainvoke_uncached(self, prompt: str) -> str:
+        for provider in self.router.candidates():
+            started = time.monotonic()
             try:
-                print(f"   Trying Gemini: {model_name}...")
-                response = llm.invoke(prompt)
+                print(f"   Trying {provider.name}...")
+                response = await provider.llm.ainvoke(prompt)
                 text = response.content if hasattr(response, 'content') else str(response)
-                print(f"   ✅ Success with {model_name}")
-                return text
             except Exception as e:
-                print(f"   ❌ {model_name} failed: {str(e)[:100]}")
+                print(f"   ❌ {provider.name} failed: {str(e)[:100]}")
+                self.router.record_failure(provider)
                 continue
-        
+            self.router.record_success(provider, time.monotonic() - started)
+            print(f"   ✅ Success with {provider.name}")
+            return text
+
         raise RuntimeError("All LLMs failed (Ollama + all Gemini models)")
 
-    def brainstorm_recipes(self, ingredients: list[str], preferences: str, saved_recipes: Optional[list[str]] = None) -> list[dict]:
+    async def _astream_with_fallback(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Streams response chunks, falling back to the next LLM only if one
+        fails before producing any output.
+        """
+        for provider in self.router.candidates():
+            started = time.monotonic()
+            first_chunk_at = None
+            try:
+                async for chunk in provider.llm.astream(prompt):
+                    text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                    if text:
+                        if first_chunk_at is None:
+                            first_chunk_at = time.monotonic()
+                        yield text
+            except Exception as e:
+                self.router.record_failure(provider)
+                if first_chunk_at is not None:
+                    raise
+                print(f"   ❌ {provider.name} stream failed: {str(e)[:100]}")
+                continue
+            # Latency to first token is what matters for streaming
+            self.router.record_success(provider, (first_chunk_at or time.monotonic()) - started)
+            return
+
+        raise RuntimeError("All LLMs failed (Ollama + all Gemini models)")
+
+    # --- Recipe brainstorming ---
+
+    def _brainstorm_prompt(self, ingredients: list[str], preferences: str, saved_recipes: Optional[list[str]] = None) -> str:
         # Aligning with main.py/RecipeAgent.py workflow
         ingredients_str = ", ".join(ingredients) if isinstance(ingredients, list) else str(ingredients)
         
@@ -113,7 +205,7 @@ class AgentService:
         if saved_recipes:
             saved_context = f"The user has previously saved these recipes: {', '.join(saved_recipes)}. Use these to understand their taste and style, but do not suggest them again. "
 
-        prompt = (
+        return (
             f"I have these ingredients: {ingredients_str}. "
             f"The user wants: {preferences}. "
             f"{saved_context}"
@@ -127,7 +219,8 @@ class AgentService:
             "STRICT CONSTRAINT: Do not suggest recipes that require other MAIN ingredients not listed here.\n"
             "Return ONLY valid JSON, no other text."
         )
-        text_content = self._invoke_with_fallback(prompt)
+
+    def _parse_brainstorm(self, prompt: str, text_content: str) -> list[dict]:
         print(f"🤖 Brainstorm Response: {text_content[:200]}...")
         
         data = self._clean_and_parse_json(text_content)
@@ -136,15 +229,25 @@ class AgentService:
             print(f"✅ Parsed {len(recipes)} recipes with nutritional info")
             return recipes
         
+        # Don't keep serving an answer we couldn't parse
+        self.llm_cache.invalidate(self._cache_key(prompt))
         # Final fallback: if JSON failed, return a static error message that's usable but descriptive
         return [{"name": "Quick Pantry Meal", "nutritional_info": {"calories": 400, "protein": 15, "carbs": 40, "fat": 12}, "health_score": 75}]
-    
-    def estimate_expiry_dates(self, ingredients: list[str]) -> dict[str, dict]:
-        """
-        Estimate typical shelf life and urgency for each ingredient.
-        Returns dict with ingredient name as key and expiry info as value.
-        """
-        prompt = (
+
+    def brainstorm_recipes(self, ingredients: list[str], preferences: str, saved_recipes: Optional[list[str]] = None) -> list[dict]:
+        prompt = self._brainstorm_prompt(ingredients, preferences, saved_recipes)
+        text_content = self._invoke_with_fallback(prompt, cache_method="brainstorm_recipes")
+        return self._parse_brainstorm(prompt, text_content)
+
+    async def abrainstorm_recipes(self, ingredients: list[str], preferences: str, saved_recipes: Optional[list[str]] = None) -> list[dict]:
+        prompt = self._brainstorm_prompt(ingredients, preferences, saved_recipes)
+        text_content = await self._ainvoke_with_fallback(prompt, cache_method="brainstorm_recipes")
+        return self._parse_brainstorm(prompt, text_content)
+
+    # --- Expiry estimation ---
+
+    def _expiry_prompt(self, ingredients: list[str]) -> str:
+        return (
             f"For each of these ingredients: {', '.join(ingredients)}\n\n"
             "Estimate the typical shelf life assuming they were purchased fresh today. "
             "Consider common storage conditions (refrigerated for perishables, pantry for dry goods).\n\n"
@@ -155,24 +258,51 @@ class AgentService:
             "Example: {\"tomatoes\": {\"days\": 5, \"urgency\": \"medium\", \"storage\": \"refrigerate\"}}\n"
             "Return ONLY valid JSON, no other text."
         )
+
+    def _parse_expiry(self, prompt: str, text_content: str) -> dict[str, dict]:
+        print("📅 Expiry response received")
         
+        expiry_data = self._clean_and_parse_json(text_content)
+        if expiry_data:
+            print(f"✅ Parsed expiry data for {len(expiry_data)} ingredients")
+            return expiry_data
+        self.llm_cache.invalidate(self._cache_key(prompt))
+        raise ValueError("Empty or invalid expiry data")
+
+    @staticmethod
+    def _default_expiry(ingredients: list[str]) -> dict[str, dict]:
+        return {ing: {"days": 7, "urgency": "medium", "storage": "pantry"} for ing in ingredients}
+
+    def estimate_expiry_dates(self, ingredients: list[str], fallback: bool = True) -> dict[str, dict]:
+        """
+        Estimate typical shelf life and urgency for each ingredient.
+        Returns dict with ingredient name as key and expiry info as value.
+        With fallback=False, errors are raised instead of returning defaults.
+        """
+        prompt = self._expiry_prompt(ingredients)
         try:
-            text_content = self._invoke_with_fallback(prompt)
-            print(f"📅 Expiry response received")
-            
-            expiry_data = self._clean_and_parse_json(text_content)
-            if expiry_data:
-                print(f"✅ Parsed expiry data for {len(expiry_data)} ingredients")
-                return expiry_data
-            raise ValueError("Empty or invalid expiry data")
+            text_content = self._invoke_with_fallback(prompt, cache_method="estimate_expiry_dates")
+            return self._parse_expiry(prompt, text_content)
         except Exception as e:
+            if not fallback:
+                raise
             print(f"❌ Expiry estimation error: {e}")
-            return {ing: {"days": 7, "urgency": "medium", "storage": "pantry"} for ing in ingredients}
+            return self._default_expiry(ingredients)
 
-    def generate_search_queries(self, recipe: str, channel_filter: str = None, cuisine_filter: str = None) -> list[str]:
-        """
-        Query Engineer Agent: Generates optimized search queries.
-        """
+    async def aestimate_expiry_dates(self, ingredients: list[str], fallback: bool = True) -> dict[str, dict]:
+        prompt = self._expiry_prompt(ingredients)
+        try:
+            text_content = await self._ainvoke_with_fallback(prompt, cache_method="estimate_expiry_dates")
+            return self._parse_expiry(prompt, text_content)
+        except Exception as e:
+            if not fallback:
+                raise
+            print(f"❌ Expiry estimation error: {e}")
+            return self._default_expiry(ingredients)
+
+    # --- Search queries ---
+
+    def _search_queries_prompt(self, recipe: str, channel_filter: str = None, cuisine_filter: str = None) -> str:
         prompt = (
             f"I need to find a YouTube video tutorial for the recipe: '{recipe}'.\n"
         )
@@ -186,21 +316,34 @@ class AgentService:
             "Consider accessibility, clarity, and the filters provided. "
             "Return ONLY a Python list of strings."
         )
-        
-        text_content = self._invoke_with_fallback(prompt)
+        return prompt
+
+    def _parse_search_queries(self, prompt: str, text_content: str, recipe: str) -> list[str]:
         try:
             start = text_content.find('[')
             end = text_content.find(']') + 1
             return eval(text_content[start:end])
         except:
+            self.llm_cache.invalidate(self._cache_key(prompt))
             return [f"{recipe} recipe"]
 
-    def verify_video(self, video_title: str, video_content: str, recipe_name: str, ingredients: list[str]) -> dict:
+    def generate_search_queries(self, recipe: str, channel_filter: str = None, cuisine_filter: str = None) -> list[str]:
         """
-        Verification Agent: Checks if the video actually teaches the recipe.
-        video_content: can be transcript or description.
+        Query Engineer Agent: Generates optimized search queries.
         """
-        prompt = (
+        prompt = self._search_queries_prompt(recipe, channel_filter, cuisine_filter)
+        text_content = self._invoke_with_fallback(prompt, cache_method="generate_search_queries")
+        return self._parse_search_queries(prompt, text_content, recipe)
+
+    async def agenerate_search_queries(self, recipe: str, channel_filter: str = None, cuisine_filter: str = None) -> list[str]:
+        prompt = self._search_queries_prompt(recipe, channel_filter, cuisine_filter)
+        text_content = await self._ainvoke_with_fallback(prompt, cache_method="generate_search_queries")
+        return self._parse_search_queries(prompt, text_content, recipe)
+
+    # --- Video verification ---
+
+    def _verify_prompt(self, video_title: str, video_content: str, recipe_name: str, ingredients: list[str]) -> str:
+        return (
             f"I am evaluating a recipe video titled '{video_title}'. "
             f"The user is looking for a recipe for: {recipe_name}. "
             f"The User ONLY has these ingredients available: {ingredients} (plus basic staples like oil/spices/water). "
@@ -209,22 +352,43 @@ class AgentService:
             "2. CRITICAL: Does the recipe in the video require MAJOR ingredients that are missing from the user's list? (Ignore minor garnishes or optional items).\n"
             "Return JSON with 'valid' (boolean - set to false if major ingredients missing), 'reason' (string), and 'confidence_score' (number 0-100)."
         )
+
+    def _parse_verification(self, prompt: str, text_content: str, video_title: str) -> dict:
+        print(f"\n🔍 Verifying: {video_title[:60]}")
         
+        result = self._clean_and_parse_json(text_content)
+        if result:
+            print(f"✅ Parsed: valid={result.get('valid')}, score={result.get('confidence_score')}")
+            return result
+        self.llm_cache.invalidate(self._cache_key(prompt))
+        raise ValueError("Could not parse verification JSON")
+
+    def verify_video(self, video_title: str, video_content: str, recipe_name: str, ingredients: list[str]) -> dict:
+        """
+        Verification Agent: Checks if the video actually teaches the recipe.
+        video_content: can be transcript or description.
+        """
+        prompt = self._verify_prompt(video_title, video_content, recipe_name, ingredients)
         try:
-            text_content = self._invoke_with_fallback(prompt)
-            print(f"\n🔍 Verifying: {video_title[:60]}")
-            
-            result = self._clean_and_parse_json(text_content)
-            if result:
-                print(f"✅ Parsed: valid={result.get('valid')}, score={result.get('confidence_score')}")
-                return result
-            raise ValueError("Could not parse verification JSON")
+            text_content = self._invoke_with_fallback(prompt, cache_method="verify_video")
+            return self._parse_verification(prompt, text_content, video_title)
         except Exception as e:
             print(f"❌ Verification Error for '{video_title[:60]}': {e}")
             return {"valid": False, "reason": f"Verification failed: {str(e)}", "confidence_score": 0}
 
-    def generate_accessible_guide(self, video_title: str, content: str, source_type: str = "transcript") -> str:
-        prompt = (
+    async def averify_video(self, video_title: str, video_content: str, recipe_name: str, ingredients: list[str]) -> dict:
+        prompt = self._verify_prompt(video_title, video_content, recipe_name, ingredients)
+        try:
+            text_content = await self._ainvoke_with_fallback(prompt, cache_method="verify_video")
+            return self._parse_verification(prompt, text_content, video_title)
+        except Exception as e:
+            print(f"❌ Verification Error for '{video_title[:60]}': {e}")
+            return {"valid": False, "reason": f"Verification failed: {str(e)}", "confidence_score": 0}
+
+    # --- Accessible guides ---
+
+    def _accessible_guide_prompt(self, video_title: str, content: str, source_type: str) -> str:
+        return (
             f"Create a clear, step-by-step recipe based on this content ({source_type}). "
             f"Video Title: {video_title}\n"
             f"Content: {content[:10000]}\n\n"
@@ -235,4 +399,29 @@ class AgentService:
             "4. Numbered steps."
             "Output the recipe in clean Markdown format."
         )
-        return self._invoke_with_fallback(prompt)
+
+    def generate_accessible_guide(self, video_title: str, content: str, source_type: str = "transcript") -> str:
+        prompt = self._accessible_guide_prompt(video_title, content, source_type)
+        return self._invoke_with_fallback(prompt, cache_method="generate_accessible_guide")
+
+    async def agenerate_accessible_guide(self, video_title: str, content: str, source_type: str = "transcript") -> str:
+        prompt = self._accessible_guide_prompt(video_title, content, source_type)
+        return await self._ainvoke_with_fallback(prompt, cache_method="generate_accessible_guide")
+
+    async def astream_accessible_guide(self, video_title: str, content: str, source_type: str = "transcript") -> AsyncIterator[str]:
+        """
+        Streaming variant of generate_accessible_guide. A cached guide is
+        yielded as a single chunk; a freshly streamed one is cached once complete.
+        """
+        prompt = self._accessible_guide_prompt(video_title, content, source_type)
+        key = self._cache_key(prompt)
+        cached = self.llm_cache.get("generate_accessible_guide", key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        async for text in self._astream_with_fallback(prompt):
+            chunks.append(text)
+            yield text
+        self.llm_cache.set("generate_accessible_guide", key, "".join(chunks))
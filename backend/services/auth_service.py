@@ -1,10 +1,13 @@
 import os
+import re
+import time
+import threading
 from typing import Optional
+import requests
 from fastapi import HTTPException
 from jose import jwt
 from datetime import datetime, timedelta
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from google.auth import jwt as google_jwt
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,6 +17,115 @@ JWT_SECRET = os.getenv("JWT_SECRET", "super-secret-key-change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7 # 1 week
 
+# Google's ID-token signing certs (PEM, keyed by kid); overridable for a local stand-in
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_CERTS_DEFAULT_TTL = int(os.getenv("GOOGLE_CERTS_DEFAULT_TTL", "3600"))  # when no max-age is sent
+GOOGLE_CERTS_REFRESH_AHEAD = int(os.getenv("GOOGLE_CERTS_REFRESH_AHEAD", "300"))  # seconds before expiry
+GOOGLE_CERTS_MIN_REFRESH_INTERVAL = int(os.getenv("GOOGLE_CERTS_MIN_REFRESH_INTERVAL", "60"))  # between forced refreshes
+GOOGLE_ISSUERS = {"accounts.google.com", "https://accounts.google.com"}
+GOOGLE_CLOCK_SKEW = 10  # seconds
+
+class GoogleTokenVerifier:
+    """
+    Verifies Google ID tokens locally against cached signing certs.
+    Certs are fetched over one pooled requests.Session and kept for the
+    Cache-Control max-age Google sends; within GOOGLE_CERTS_REFRESH_AHEAD
+    of expiry a background thread refreshes them, so sign-ins never wait on
+    the fetch unless the cache is empty or stale. A token signed with an
+    unknown key id forces one refresh (key rotation), at most once per
+    GOOGLE_CERTS_MIN_REFRESH_INTERVAL; within that window such tokens are
+    rejected against the certs already held, so garbage tokens can't drive
+    outbound fetches.
+    """
+    def __init__(self, certs_url: str = GOOGLE_CERTS_URL, client_id: Optional[str] = GOOGLE_CLIENT_ID, session: requests.Session = None):
+        self.certs_url = certs_url
+        self.client_id = client_id
+        self.session = session or requests.Session()
+        self._certs = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()  # one fetch at a time, however many sign-ins wait
+        self._refreshing = False
+        self.fetches = 0
+
+    @staticmethod
+    def _max_age(cache_control: str) -> int:
+        match = re.search(r"max-age=(\d+)", cache_control or "")
+        return int(match.group(1)) if match else GOOGLE_CERTS_DEFAULT_TTL
+
+    def _fetch(self):
+        response = self.session.get(self.certs_url, timeout=10)
+        response.raise_for_status()
+        certs = response.json()
+        ttl = self._max_age(response.headers.get("Cache-Control"))
+        now = time.monotonic()
+        with self._lock:
+            self._certs = certs
+            self._expires_at = now + ttl
+            self._refresh_at = now + max(ttl - GOOGLE_CERTS_REFRESH_AHEAD, ttl / 2)
+            self._fetched_at = now
+            self.fetches += 1
+        print(f"🔑 Fetched {len(certs)} Google signing certs, valid for {ttl}s")
+
+    def _refresh_in_background(self):
+        def run():
+            try:
+                with self._fetch_lock:
+                    self._fetch()
+            except Exception as e:
+                print(f"⚠️ Background Google cert refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=run, name="google-certs-refresh", daemon=True).start()
+
+    def _fetched_recently(self) -> bool:
+        return self._fetched_at is not None and time.monotonic() - self._fetched_at < GOOGLE_CERTS_MIN_REFRESH_INTERVAL
+
+    def certs(self, force_refresh: bool = False) -> dict:
+        with self._lock:
+            certs, expires_at, refresh_at = self._certs, self._expires_at, self._refresh_at
+            if force_refresh and self._fetched_recently():
+                # Keys can't have rotated again this soon: an unknown kid is a bad token
+                force_refresh = False
+        if force_refresh or certs is None or time.monotonic() >= expires_at:
+            with self._fetch_lock:
+                with self._lock:
+                    # Someone else may have fetched while we waited
+                    fresh = self._certs is not certs and time.monotonic() < self._expires_at
+                    if force_refresh and self._fetched_recently():
+                        fresh = True
+                if not fresh:
+                    self._fetch()
+                with self._lock:
+                    return self._certs
+        if time.monotonic() >= refresh_at:
+            self._refresh_in_background()
+        return certs
+
+    def _decode(self, token: str, certs: dict) -> dict:
+        return google_jwt.decode(token, certs=certs, audience=self.client_id, clock_skew_in_seconds=GOOGLE_CLOCK_SKEW)
+
+    def verify(self, token: str) -> dict:
+        try:
+            idinfo = self._decode(token, self.certs())
+        except ValueError as e:
+            if "Certificate for key id" not in str(e):
+                raise
+            idinfo = self._decode(token, self.certs(force_refresh=True))
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {idinfo.get('iss')}")
+        return idinfo
+
+google_verifier = GoogleTokenVerifier()
+
 class AuthService:
     @staticmethod
     def verify_google_token(token: str):
@@ -24,7 +136,7 @@ class AuthService:
         
         try:
             print(f"DEBUG: Attempting verification with GOOGLE_CLIENT_ID: {GOOGLE_CLIENT_ID}")
-            idinfo = id_token.verify_oauth2_token(token, google_requests.Request(), GOOGLE_CLIENT_ID)
+            idinfo = google_verifier.verify(token)
             print(f"DEBUG: Token verified. Email: {idinfo.get('email')}")
             return idinfo
         except Exception as e:
@@ -0,0 +1,180 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from eyepop import EyePopSdk
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EYEPOP_POOL_SIZE = int(os.getenv("EYEPOP_POOL_SIZE", "2"))  # endpoints per pop
+EYEPOP_MAX_IDLE = float(os.getenv("EYEPOP_MAX_IDLE", "300"))  # seconds before an unchecked idle endpoint is reopened
+EYEPOP_KEEPALIVE_INTERVAL = float(os.getenv("EYEPOP_KEEPALIVE_INTERVAL", "60"))  # probe endpoints idle this long
+EYEPOP_ACQUIRE_TIMEOUT = float(os.getenv("EYEPOP_ACQUIRE_TIMEOUT", "60"))  # seconds to wait for a free endpoint
+
+class PooledEndpoint:
+    def __init__(self, endpoint, pop_name: str):
+        self.endpoint = endpoint
+        self.pop_name = pop_name
+        self.last_used = time.monotonic()
+
+class EyePopEndpointPool:
+    """
+    Long-lived, connected EyePop worker endpoints, each pinned to one pop so
+    a scan never pays session setup or set_pop. At most `size` endpoints per
+    pop exist at once; callers wait (up to `acquire_timeout`) for a free
+    one, and a slot freed by a dropped endpoint lets the next waiter open a
+    fresh one. Endpoints that fail a request are dropped. A keepalive thread
+    probes endpoints idle for `keepalive_interval` (re-applying their pop, a
+    real round trip to the worker) and reconnects the ones that fail, so
+    scans get a warm endpoint even after a quiet spell; an endpoint that
+    somehow went unchecked for `max_idle` is reopened rather than trusted.
+    """
+    def __init__(self, api_key: str, pops: dict, size: int = EYEPOP_POOL_SIZE, max_idle: float = EYEPOP_MAX_IDLE,
+                 acquire_timeout: float = EYEPOP_ACQUIRE_TIMEOUT, keepalive_interval: float = EYEPOP_KEEPALIVE_INTERVAL):
+        self.api_key = api_key
+        self.pops = pops
+        self.size = max(1, size)
+        self.max_idle = max_idle
+        self.acquire_timeout = acquire_timeout
+        self.keepalive_interval = keepalive_interval
+        self._idle = {name: [] for name in pops}  # LIFO stacks of PooledEndpoint
+        self._created = {name: 0 for name in pops}
+        self._cond = threading.Condition()
+        self._keepalive = None
+        self._stopping = threading.Event()
+
+    def _open(self, pop_name: str) -> PooledEndpoint:
+        print(f"🔌 Opening EyePop endpoint for '{pop_name}'...")
+        endpoint = EyePopSdk.workerEndpoint(api_key=self.api_key)
+        endpoint.connect()
+        try:
+            endpoint.set_pop(self.pops[pop_name])
+        except Exception:
+            self._disconnect(endpoint)
+            raise
+        return PooledEndpoint(endpoint, pop_name)
+
+    @staticmethod
+    def _disconnect(endpoint):
+        try:
+            endpoint.disconnect()
+        except Exception as e:
+            print(f"⚠️ EyePop disconnect failed: {e}")
+
+    def _release_slot(self, pop_name: str):
+        with self._cond:
+            self._created[pop_name] -= 1
+            self._cond.notify()
+
+    def _discard(self, pooled: PooledEndpoint):
+        self._disconnect(pooled.endpoint)
+        self._release_slot(pooled.pop_name)
+
+    def _acquire(self, pop_name: str) -> PooledEndpoint:
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                idle = self._idle[pop_name]
+                if idle:
+                    pooled = idle.pop()
+                    break
+                if self._created[pop_name] < self.size:
+                    # Reserve a slot; the endpoint is opened outside the lock
+                    self._created[pop_name] += 1
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No EyePop endpoint for '{pop_name}' became free within {self.acquire_timeout:.0f}s")
+                self._cond.wait(remaining)
+
+        if pooled is not None:
+            if time.monotonic() - pooled.last_used < self.max_idle:
+                return pooled
+            # Idle too long to trust; reopen it in the same slot
+            print(f"♻️ Reopening EyePop endpoint for '{pop_name}' after idling")
+            self._disconnect(pooled.endpoint)
+        try:
+            return self._open(pop_name)
+        except Exception:
+            self._release_slot(pop_name)
+            raise
+
+    @contextmanager
+    def endpoint(self, pop_name: str):
+        """Borrows a connected endpoint already configured with `pop_name`."""
+        pooled = self._acquire(pop_name)
+        try:
+            yield pooled.endpoint
+        except Exception:
+            # Don't hand a possibly broken session to the next scan
+            self._discard(pooled)
+            raise
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle[pop_name].append(pooled)
+            self._cond.notify()
+
+    def _probe(self, pooled: PooledEndpoint):
+        # get_pop() only returns the SDK's cached Pop; set_pop goes to the worker
+        pooled.endpoint.set_pop(self.pops[pooled.pop_name])
+
+    def check_idle(self):
+        """Probes endpoints idle for keepalive_interval; reconnects those that fail."""
+        now = time.monotonic()
+        with self._cond:
+            # Take them out of rotation while they're probed
+            due = []
+            for stack in self._idle.values():
+                stale = [pooled for pooled in stack if now - pooled.last_used >= self.keepalive_interval]
+                stack[:] = [pooled for pooled in stack if pooled not in stale]
+                due += stale
+        for pooled in due:
+            try:
+                self._probe(pooled)
+            except Exception as e:
+                print(f"⚠️ EyePop endpoint for '{pooled.pop_name}' failed its keepalive ({e}), reconnecting...")
+                self._disconnect(pooled.endpoint)
+                try:
+                    pooled = self._open(pooled.pop_name)
+                except Exception as e:
+                    print(f"❌ Could not reopen EyePop endpoint for '{pooled.pop_name}': {e}")
+                    self._release_slot(pooled.pop_name)
+                    continue
+            pooled.last_used = time.monotonic()
+            with self._cond:
+                self._idle[pooled.pop_name].append(pooled)
+                self._cond.notify()
+
+    def _keepalive_loop(self):
+        while not self._stopping.wait(self.keepalive_interval / 2):
+            try:
+                self.check_idle()
+            except Exception as e:
+                print(f"⚠️ EyePop keepalive failed: {e}")
+
+    def start_keepalive(self):
+        if self._keepalive is None or not self._keepalive.is_alive():
+            self._stopping.clear()
+            self._keepalive = threading.Thread(target=self._keepalive_loop, name="eyepop-keepalive", daemon=True)
+            self._keepalive.start()
+
+    def warm(self):
+        """Starts the keepalive and opens one endpoint per pop up front."""
+        self.start_keepalive()
+        for pop_name in self.pops:
+            with self.endpoint(pop_name):
+                pass
+
+    def close(self):
+        self._stopping.set()
+        if self._keepalive is not None:
+            self._keepalive.join(timeout=5)
+            self._keepalive = None
+        with self._cond:
+            idle = [pooled for stack in self._idle.values() for pooled in stack]
+            for stack in self._idle.values():
+                stack.clear()
+        for pooled in idle:
+            self._discard(pooled)
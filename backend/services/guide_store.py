@@ -0,0 +1,43 @@
+import zlib
+import hashlib
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from database import dialect_insert
+from models.db_models import RecipeGuide
+
+class GuideStore:
+    """
+    Content-addressed storage for accessible guides. Each distinct guide is
+    kept once as a zlib-compressed body keyed by its sha256, so every user
+    saving the same video's guide points at one recipe_guides row.
+    """
+    @staticmethod
+    def content_hash(markdown: str) -> str:
+        return hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def compress(markdown: str) -> bytes:
+        return zlib.compress(markdown.encode("utf-8"), 6)
+
+    @staticmethod
+    def decompress(body: Optional[bytes]) -> Optional[str]:
+        return zlib.decompress(body).decode("utf-8") if body else None
+
+    @staticmethod
+    def row_for(markdown: str, video_url: Optional[str]) -> dict:
+        return {
+            "content_hash": GuideStore.content_hash(markdown),
+            "video_url": video_url,
+            "body": GuideStore.compress(markdown),
+            "size": len(markdown)
+        }
+
+    @staticmethod
+    async def save(db: AsyncSession, markdown: str, video_url: Optional[str] = None) -> int:
+        """Stores a guide unless an identical one exists; returns its id. Does not commit."""
+        row = GuideStore.row_for(markdown, video_url)
+        stmt = dialect_insert(db, RecipeGuide).values(**row).on_conflict_do_nothing(index_elements=["content_hash"])
+        await db.execute(stmt)
+        result = await db.execute(select(RecipeGuide.id).where(RecipeGuide.content_hash == row["content_hash"]))
+        return result.scalar_one()
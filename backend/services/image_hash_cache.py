@@ -0,0 +1,65 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "256"))
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", "3600"))  # 1 hour
+IMAGE_CACHE_MAX_DISTANCE = int(os.getenv("IMAGE_CACHE_MAX_DISTANCE", "6"))  # of 64 bits
+
+def dhash_gray(gray: np.ndarray) -> int:
+    """64-bit difference hash of a grayscale image."""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+class ImageHashCache:
+    """
+    Recent uploads keyed by (scope, perceptual hash). A new image whose hash
+    is within `max_distance` bits (Hamming) of a cached one in the same scope
+    reuses its ingredient list. Scope is the uploading user, so one user's
+    results are never served to another. Bounded to `maxsize` entries (LRU)
+    with a TTL.
+    """
+    def __init__(self, maxsize: int = IMAGE_CACHE_SIZE, ttl: int = IMAGE_CACHE_TTL, max_distance: int = IMAGE_CACHE_MAX_DISTANCE):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # (scope, hash) -> (ingredients, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, scope, image_hash: int) -> Optional[list[str]]:
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_distance = None, self.max_distance + 1
+            for key, (_, expires_at) in list(self._entries.items()):
+                if expires_at <= now:
+                    del self._entries[key]
+                    continue
+                if key[0] != scope:
+                    continue
+                distance = (key[1] ^ image_hash).bit_count()
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return list(self._entries[best_key][0])
+
+    def add(self, scope, image_hash: int, ingredients: list[str]):
+        key = (scope, image_hash)
+        with self._lock:
+            self._entries[key] = (list(ingredients), time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
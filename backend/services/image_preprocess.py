@@ -0,0 +1,70 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PREPROCESS_MAX_SIDE = int(os.getenv("PREPROCESS_MAX_SIDE", "1280"))  # detector input needs no more
+PREPROCESS_JPEG_QUALITY = int(os.getenv("PREPROCESS_JPEG_QUALITY", "85"))
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+THUMBNAIL_MAX_SIDE = 256  # grayscale copy for hashing / quality checks
+
+class PreprocessedImage(NamedTuple):
+    jpeg: bytes  # re-encoded upload, ready for EyePop
+    gray: np.ndarray  # small grayscale thumbnail
+    width: int
+    height: int
+
+def preprocess_image(data: bytes, max_side: int = PREPROCESS_MAX_SIDE, quality: int = PREPROCESS_JPEG_QUALITY) -> PreprocessedImage:
+    """
+    Decodes an upload, applies its EXIF orientation (imdecode does this
+    unless IMREAD_IGNORE_ORIENTATION is set), downscales it to `max_side`
+    and re-encodes it as JPEG. CPU-bound: run it in the process pool.
+    """
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Unreadable image upload")
+
+    h, w = img.shape[:2]
+    scale = max_side / max(h, w)
+    if scale < 1:
+        img = cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+        h, w = img.shape[:2]
+
+    ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_OPTIMIZE, 1])
+    if not ok:
+        raise ValueError("Could not re-encode image")
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    thumb_scale = THUMBNAIL_MAX_SIDE / max(h, w)
+    if thumb_scale < 1:
+        gray = cv2.resize(gray, (max(1, round(w * thumb_scale)), max(1, round(h * thumb_scale))), interpolation=cv2.INTER_AREA)
+
+    return PreprocessedImage(encoded.tobytes(), gray, w, h)
+
+_pool = None
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawn, not fork: forking a process that already runs the event loop,
+        # DB pool and SDK threads copies their locks in whatever state they're in.
+        # Spawned workers re-import __main__, so serve via `uvicorn app:app`
+        # (app.py's __main__ block does) rather than importing app as __main__.
+        _pool = ProcessPoolExecutor(max_workers=PREPROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+async def apreprocess_image(data: bytes) -> PreprocessedImage:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), preprocess_image, data)
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,60 @@
+import os
+from typing import NamedTuple
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Thresholds apply to the ~256px grayscale thumbnail from image_preprocess.
+# They are deliberately loose: only photos EyePop can't use are rejected.
+BLUR_THRESHOLD = float(os.getenv("QUALITY_BLUR_THRESHOLD", "40"))  # Laplacian variance
+DARK_MEAN = float(os.getenv("QUALITY_DARK_MEAN", "25"))
+BRIGHT_MEAN = float(os.getenv("QUALITY_BRIGHT_MEAN", "235"))
+CLIPPED_FRACTION = float(os.getenv("QUALITY_CLIPPED_FRACTION", "0.6"))
+EMPTY_STD = float(os.getenv("QUALITY_EMPTY_STD", "8"))
+EMPTY_EDGE_DENSITY = float(os.getenv("QUALITY_EMPTY_EDGE_DENSITY", "0.004"))
+
+RETAKE_MESSAGES = {
+    "blurry": "The photo is too blurry. Hold the camera steady and retake it.",
+    "too_dark": "The photo is too dark. Turn on a light or open the fridge door wider.",
+    "overexposed": "The photo is washed out. Avoid pointing the camera at bright lights.",
+    "empty_frame": "Nothing seems to be in frame. Point the camera at your ingredients.",
+}
+
+class QualityReport(NamedTuple):
+    ok: bool
+    reasons: list
+    scores: dict
+
+def assess_quality(gray: np.ndarray) -> QualityReport:
+    """
+    Scores blur, exposure and empty frames on a downsampled grayscale image
+    (server-side port of my_eyepop.ObjDet.is_blurry, plus exposure checks).
+    """
+    blur = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    mean = float(gray.mean())
+    std = float(gray.std())
+    clipped = float(np.count_nonzero((gray < 10) | (gray > 245))) / gray.size
+    edges = float(np.count_nonzero(cv2.Canny(gray, 50, 150))) / gray.size
+
+    reasons = []
+    if mean < DARK_MEAN:
+        reasons.append("too_dark")
+    elif mean > BRIGHT_MEAN or (clipped > CLIPPED_FRACTION and mean > 127):
+        reasons.append("overexposed")
+    if std < EMPTY_STD or edges < EMPTY_EDGE_DENSITY:
+        reasons.append("empty_frame")
+    elif blur < BLUR_THRESHOLD:
+        # A flat frame has no edges to be sharp or blurry; only judge blur otherwise
+        reasons.append("blurry")
+
+    scores = {
+        "blur": round(blur, 2),
+        "brightness": round(mean, 2),
+        "contrast": round(std, 2),
+        "clipped_fraction": round(clipped, 4),
+        "edge_density": round(edges, 4),
+    }
+    print(f"🧪 Quality scores: {scores}")
+    return QualityReport(not reasons, reasons, scores)
@@ -0,0 +1,112 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, Optional
+
+# Words that describe an ingredient's state or quality rather than what it is
+DESCRIPTORS = {
+    "fresh", "organic", "raw", "ripe", "whole", "large", "small", "medium", "jumbo",
+    "baby", "chopped", "sliced", "diced", "minced", "shredded", "grated", "peeled",
+    "boneless", "skinless", "unsalted", "salted", "pack", "package", "bag", "box",
+    "bunch", "can", "jar", "bottle", "of", "a", "some",
+}
+
+# Words that already end in "s" in their singular form
+PLURAL_EXCEPTIONS = {
+    "hummus", "asparagus", "couscous", "molasses", "swiss", "grits", "greens",
+    "citrus", "hibiscus", "octopus", "brussels", "series", "anis", "pastis",
+}
+
+IRREGULAR_PLURALS = {
+    "cookies": "cookie", "pies": "pie", "brownies": "brownie", "leaves": "leaf",
+    "loaves": "loaf", "halves": "half", "knives": "knife", "mangoes": "mango",
+    "tomatoes": "tomato", "potatoes": "potato", "avocadoes": "avocado",
+    "chips": "chip", "peas": "pea", "chickpeas": "chickpea", "oats": "oat",
+    # -ie singulars the "ies" -> "y" rule would mangle
+    "chilies": "chili", "chillies": "chilli", "smoothies": "smoothie", "veggies": "veggie",
+}
+
+# variant -> canonical name (keys are singularized when the index is built)
+SYNONYMS = {
+    "scallion": "green onion", "spring onion": "green onion",
+    "courgette": "zucchini", "aubergine": "eggplant", "capsicum": "bell pepper",
+    "red bell pepper": "bell pepper", "green bell pepper": "bell pepper", "sweet pepper": "bell pepper",
+    "coriander": "cilantro", "garbanzo bean": "chickpea", "garbanzo": "chickpea",
+    "roma tomato": "tomato", "cherry tomato": "tomato", "grape tomato": "tomato",
+    "plum tomato": "tomato", "vine tomato": "tomato", "heirloom tomato": "tomato",
+    "minced beef": "ground beef", "beef mince": "ground beef", "hamburger meat": "ground beef",
+    "chicken egg": "egg", "hen egg": "egg",
+    "yoghurt": "yogurt", "greek yoghurt": "greek yogurt",
+    "extra virgin olive oil": "olive oil", "evoo": "olive oil",
+    "prawn": "shrimp", "rocket": "arugula", "jalapeno pepper": "jalapeno",
+    "chilli": "chili pepper", "chili": "chili pepper", "chile": "chili pepper",
+    "chilli pepper": "chili pepper", "chile pepper": "chili pepper",
+    "cheddar cheese": "cheddar", "mozzarella cheese": "mozzarella", "parmesan cheese": "parmesan",
+    "parmigiano reggiano": "parmesan", "feta cheese": "feta",
+    "spaghetti": "pasta", "penne": "pasta", "macaroni": "pasta",
+    "white rice": "rice", "brown rice": "rice", "basmati rice": "rice", "jasmine rice": "rice",
+    "all purpose flour": "flour", "plain flour": "flour", "white sugar": "sugar", "granulated sugar": "sugar",
+    "whole milk": "milk", "skim milk": "milk", "2% milk": "milk",
+    "mayo": "mayonnaise", "catsup": "ketchup", "soya sauce": "soy sauce",
+    "rolled oat": "oat", "oatmeal": "oat", "crisps": "chip", "potato chip": "chip",
+}
+
+def singularize(word: str) -> str:
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if word in PLURAL_EXCEPTIONS:
+        return word
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "sses", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+def _fold(text: str) -> str:
+    """Lowercases, strips accents ("jalapeño" -> "jalapeno") and punctuation."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r"[^a-z0-9% ]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def _singular_phrase(phrase: str) -> str:
+    # Only the head noun (last word) carries the plural: "green beans" -> "green bean"
+    words = phrase.split(" ")
+    words[-1] = singularize(words[-1])
+    return " ".join(words)
+
+# Precomputed once at import: singular-form variant -> canonical name
+SYNONYM_INDEX = {_singular_phrase(_fold(k)): v for k, v in SYNONYMS.items()}
+
+@lru_cache(maxsize=8192)
+def canonicalize(name: Optional[str]) -> str:
+    """
+    Maps a raw ingredient string to its canonical name:
+    "Tomatoes" / "roma tomatoes" / "Fresh Tomato" -> "tomato".
+    Returns "" for empty input.
+    """
+    if not name:
+        return ""
+    folded = _fold(name)
+    words = [w for w in folded.split(" ") if w and w not in DESCRIPTORS and not w.isdigit()]
+    if not words:
+        return folded
+    phrase = _singular_phrase(" ".join(words))
+    return SYNONYM_INDEX.get(phrase, phrase)
+
+def canonicalize_all(names: Iterable[Optional[str]]) -> list[str]:
+    """Canonicalizes a whole list, dropping empties and duplicates (first occurrence wins)."""
+    seen = set()
+    result = []
+    for name in names:
+        key = canonicalize(name)
+        if key and key not in seen:
+            seen.add(key)
+            result.append(key)
+    return result
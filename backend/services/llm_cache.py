@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Optional
+from dotenv import load_dotenv
+from services.cache import TTLCache
+
+load_dotenv()
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR")  # Optional on-disk tier, off when unset
+
+# Seconds each AgentService method may reuse an answer. 0 disables caching.
+LLM_CACHE_TTLS = {
+    "brainstorm_recipes": 10 * 60,
+    "estimate_expiry_dates": 7 * 24 * 3600,
+    "generate_search_queries": 24 * 3600,
+    "verify_video": 24 * 3600,
+    "generate_accessible_guide": 7 * 24 * 3600,
+}
+
+class LLMCache:
+    """
+    Content-addressed LLM response cache: a memory LRU tier in front of an
+    optional on-disk tier (one compressed file per key under `disk_dir`).
+    Keys hash the prompt together with the model chain and temperature.
+    """
+    def __init__(self, maxsize: int = LLM_CACHE_SIZE, disk_dir: Optional[str] = LLM_CACHE_DIR, ttls: dict = None):
+        self.memory = TTLCache(maxsize=maxsize)
+        self.disk_dir = disk_dir
+        self.ttls = dict(LLM_CACHE_TTLS if ttls is None else ttls)
+        self.counters = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._lock = threading.Lock()
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float) -> str:
+        payload = f"{model}\x00{temperature}\x00{prompt}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def ttl_for(self, method: Optional[str]) -> int:
+        return self.ttls.get(method, 0) if method else 0
+
+    def get(self, method: str, key: str) -> Optional[str]:
+        text = self.memory.get(key)
+        if text is None and self.disk_dir:
+            text = self._disk_get(key)
+        self._count(method, "hits" if text is not None else "misses")
+        return text
+
+    def set(self, method: str, key: str, text: str):
+        ttl = self.ttl_for(method)
+        if ttl <= 0:
+            return
+        self.memory.set(key, text, ttl=ttl)
+        if self.disk_dir:
+            self._disk_set(key, text, ttl)
+
+    def invalidate(self, key: str):
+        self.memory.pop(key)
+        if self.disk_dir:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            methods = {m: dict(c) for m, c in self.counters.items()}
+        return {"memory": self.memory.stats(), "methods": methods}
+
+    def _count(self, method: str, field: str):
+        with self._lock:
+            self.counters[method][field] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json.z")
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = json.loads(zlib.decompress(f.read()))
+        except (OSError, ValueError, zlib.error):
+            return None
+
+        remaining = entry["expires_at"] - time.time()
+        if remaining <= 0:
+            self.invalidate(key)
+            return None
+        # Promote to the memory tier for the rest of its lifetime
+        self.memory.set(key, entry["text"], ttl=remaining)
+        return entry["text"]
+
+    def _disk_set(self, key: str, text: str, ttl: int):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(zlib.compress(json.dumps({"expires_at": time.time() + ttl, "text": text}).encode("utf-8")))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ LLM cache write failed: {e}")
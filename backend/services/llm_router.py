@@ -0,0 +1,146 @@
+import os
+import time
+import asyncio
+import threading
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "2"))  # consecutive failures
+CIRCUIT_PROBE_INTERVAL = float(os.getenv("LLM_CIRCUIT_PROBE_INTERVAL", "30"))  # seconds
+CIRCUIT_MAX_PROBE_INTERVAL = float(os.getenv("LLM_CIRCUIT_MAX_PROBE_INTERVAL", "600"))
+PROBE_TIMEOUT = float(os.getenv("LLM_PROBE_TIMEOUT", "10"))
+PROBE_PROMPT = "Reply with the single word OK."
+EWMA_ALPHA = 0.3
+
+class ProviderHealth:
+    """Running health stats for one LLM backend."""
+    def __init__(self, index: int, name: str, llm):
+        self.index = index  # configured fallback position
+        self.name = name
+        self.llm = llm
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.success_rate = 1.0  # EWMA
+        self.latency = None  # EWMA seconds
+        self.last_success_at = None
+        self.opened_at = None
+        self.probe_interval = CIRCUIT_PROBE_INTERVAL
+        self.next_probe_at = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "state": "open" if self.is_open else "closed",
+            "successes": self.successes,
+            "failures": self.failures,
+            "success_rate": round(self.success_rate, 3),
+            "latency_s": round(self.latency, 3) if self.latency is not None else None,
+        }
+
+class LLMRouter:
+    """
+    Orders LLM backends by health. A backend that fails
+    `failure_threshold` times in a row gets an open circuit and is skipped
+    until a background probe sees it answer again. Healthy backends are
+    tried in configured order; open circuits that are due a trial come
+    after them, most-recently-successful first.
+    """
+    def __init__(self, providers: list[tuple], failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD):
+        self.providers = [ProviderHealth(i, name, llm) for i, (name, llm) in enumerate(providers)]
+        self.failure_threshold = failure_threshold
+        self._lock = threading.Lock()
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def candidates(self) -> list[ProviderHealth]:
+        """Backends to try, in order. If every circuit is open, all are tried as a last resort."""
+        now = time.monotonic()
+        with self._lock:
+            closed = [p for p in self.providers if not p.is_open]
+            fallback = [p for p in self.providers if p.is_open and self._half_open(p, now)]
+            if not closed and not fallback:
+                fallback = list(self.providers)
+            # Closed circuits keep the configured order so a cheaper backend that
+            # merely hiccupped stays first; recency only ranks the fallback tier
+            fallback.sort(key=lambda p: (
+                p.last_success_at is None,
+                -(p.last_success_at or 0),
+                p.index
+            ))
+            return closed + fallback
+
+    def _half_open(self, p: ProviderHealth, now: float) -> bool:
+        # Without a running probe (e.g. sync scripts), let one call through per interval
+        probing = self._probe_task is not None and not self._probe_task.done()
+        return not probing and now >= p.next_probe_at
+
+    def record_success(self, p: ProviderHealth, latency: float):
+        with self._lock:
+            p.successes += 1
+            p.consecutive_failures = 0
+            p.success_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * p.success_rate
+            p.latency = latency if p.latency is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * p.latency
+            p.last_success_at = time.monotonic()
+            if p.is_open:
+                print(f"✅ {p.name} healthy again, closing circuit")
+            p.opened_at = None
+            p.probe_interval = CIRCUIT_PROBE_INTERVAL
+
+    def record_failure(self, p: ProviderHealth):
+        with self._lock:
+            p.failures += 1
+            p.consecutive_failures += 1
+            p.success_rate = (1 - EWMA_ALPHA) * p.success_rate
+            now = time.monotonic()
+            if p.is_open:
+                # Failed probe or half-open trial: back off further
+                p.probe_interval = min(p.probe_interval * 2, CIRCUIT_MAX_PROBE_INTERVAL)
+                p.next_probe_at = now + p.probe_interval
+            elif p.consecutive_failures >= self.failure_threshold:
+                print(f"🔌 Opening circuit for {p.name} after {p.consecutive_failures} failures")
+                p.opened_at = now
+                p.next_probe_at = now + p.probe_interval
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [p.snapshot() for p in self.providers]
+
+    # --- Background probe ---
+
+    def start_probe(self):
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def stop_probe(self):
+        if self._probe_task:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            with self._lock:
+                due = [p for p in self.providers if p.is_open and now >= p.next_probe_at]
+            for p in due:
+                await self._probe(p)
+
+    async def _probe(self, p: ProviderHealth):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(p.llm.ainvoke(PROBE_PROMPT), timeout=PROBE_TIMEOUT)
+        except Exception as e:
+            print(f"   🩺 Probe failed for {p.name}: {str(e)[:100]}")
+            self.record_failure(p)
+            return
+        self.record_success(p, time.monotonic() - started)
@@ -1,5 +1,12 @@
 import os
+import time
+import queue
+import asyncio
 import smtplib
+import threading
+from contextlib import contextmanager
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
@@ -12,19 +19,183 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 FROM_EMAIL = os.getenv("FROM_EMAIL", SMTP_USER)
+# "ssl" (implicit TLS), "starttls" or "none" (plain, e.g. a local aiosmtpd stand-in)
+SMTP_SECURITY = os.getenv("SMTP_SECURITY", "ssl" if SMTP_PORT == 465 else "starttls").lower()
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+# Delivery engine
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))  # authenticated connections / sender threads
+SMTP_RATE_LIMIT = float(os.getenv("SMTP_RATE_LIMIT", "10"))  # messages per second, 0 = unlimited
+SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", "3"))
+SMTP_RETRY_BACKOFF = float(os.getenv("SMTP_RETRY_BACKOFF", "1.0"))  # seconds, doubled per attempt
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads."""
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+class PooledConnection:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.sent = 0
+
+class SmtpConnectionPool:
+    """
+    Up to `size` logged-in SMTP connections, reused across messages.
+    A connection that errors is closed and replaced on next use; connections
+    are also recycled after SMTP_MAX_MESSAGES_PER_CONNECTION messages since
+    most providers cap messages per session.
+    """
+    def __init__(self, host: str = SMTP_SERVER, port: int = SMTP_PORT, security: str = SMTP_SECURITY,
+                 user: str = SMTP_USER, password: str = SMTP_PASSWORD, size: int = SMTP_POOL_SIZE,
+                 max_messages: int = SMTP_MAX_MESSAGES_PER_CONNECTION):
+        self.host = host
+        self.port = port
+        self.security = security
+        self.user = user
+        self.password = password
+        self.size = max(1, size)
+        self.max_messages = max_messages
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _open(self) -> PooledConnection:
+        if self.security == "ssl":
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+            if self.security == "starttls":
+                server.starttls()
+        if self.user and self.password:
+            server.login(self.user, self.password)
+        return PooledConnection(server)
+
+    @staticmethod
+    def _close(pooled: PooledConnection):
+        try:
+            pooled.server.quit()
+        except Exception:
+            pooled.server.close()
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                pooled = self._open()
+            try:
+                yield pooled.server
+            except Exception:
+                # Don't reuse a session in an unknown state
+                self._close(pooled)
+                raise
+            pooled.sent += 1
+            if pooled.sent >= self.max_messages:
+                self._close(pooled)
+            else:
+                self._idle.put(pooled)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+def _is_transient(error: Exception) -> bool:
+    """Connection problems and 4xx replies are worth retrying; 5xx are not."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+class EmailDeliveryEngine:
+    """
+    Sends messages over a SmtpConnectionPool from a small thread pool, so
+    async callers never block the event loop. Sends are rate limited and
+    transient failures are retried with exponential backoff.
+    """
+    def __init__(self, pool: SmtpConnectionPool = None, rate: float = SMTP_RATE_LIMIT,
+                 max_retries: int = SMTP_MAX_RETRIES, backoff: float = SMTP_RETRY_BACKOFF):
+        self.pool = pool or SmtpConnectionPool()
+        self.rate_limiter = RateLimiter(rate)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix="smtp")
+            return self._executor
+
+    def send(self, from_addr: str, to_addr: str, message: str) -> bool:
+        """Blocking send with retries. Returns whether the message was accepted."""
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                with self.pool.connection() as server:
+                    server.sendmail(from_addr, to_addr, message)
+                return True
+            except Exception as e:
+                if attempt == self.max_retries or not _is_transient(e):
+                    print(f"❌ Failed to send email to {to_addr}: {e}")
+                    return False
+                delay = self.backoff * (2 ** attempt)
+                print(f"⚠️ SMTP send to {to_addr} failed ({e}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+        return False
+
+    async def asend(self, from_addr: str, to_addr: str, message: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self.send, from_addr, to_addr, message)
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.pool.close()
+
+delivery_engine = EmailDeliveryEngine()
 
 class NotificationService:
     @staticmethod
-    def send_expiry_email(user_email: str, user_name: str, items: list):
-        if not all([SMTP_USER, SMTP_PASSWORD]):
+    def _can_send() -> bool:
+        if SMTP_SECURITY != "none" and not all([SMTP_USER, SMTP_PASSWORD]):
             print("⚠️ SMTP credentials not set. Skipping email.")
-            return
+            return False
+        return True
 
+    @staticmethod
+    def build_expiry_email(user_email: str, user_name: str, items: list, message_id: Optional[str] = None) -> MIMEMultipart:
         # Create message
         message = MIMEMultipart("alternative")
         message["Subject"] = "⏰ SnapChef: Ingredients Expiring Soon!"
         message["From"] = FROM_EMAIL
         message["To"] = user_email
+        if message_id:
+            # Stable across redeliveries so receiving servers can drop duplicates
+            message["Message-ID"] = message_id
 
         # Create HTML content
         items_html = "<ul>"
@@ -50,23 +221,29 @@ class NotificationService:
         """
 
         message.attach(MIMEText(html_content, "html"))
+        return message
 
-        try:
-            # Connect to SMTP server
-            if SMTP_PORT == 465:
-                # SSL connection
-                server = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT)
-            else:
-                # STARTTLS connection
-                server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-                server.starttls()
-            
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.sendmail(FROM_EMAIL, user_email, message.as_string())
-            server.quit()
-            
+    @staticmethod
+    def send_expiry_email(user_email: str, user_name: str, items: list):
+        """Blocking variant; prefer asend_expiry_email from async code."""
+        if not NotificationService._can_send():
+            return None
+        message = NotificationService.build_expiry_email(user_email, user_name, items)
+        if delivery_engine.send(FROM_EMAIL, user_email, message.as_string()):
             print(f"📧 Notification email sent to {user_email} via SMTP")
             return 200
-        except Exception as e:
-            print(f"❌ Failed to send email via SMTP: {e}")
+        return None
+
+    @staticmethod
+    async def asend_expiry_email(user_email: str, user_name: str, items: list, message_id: Optional[str] = None):
+        if not NotificationService._can_send():
             return None
+        message = NotificationService.build_expiry_email(user_email, user_name, items, message_id)
+        if await delivery_engine.asend(FROM_EMAIL, user_email, message.as_string()):
+            print(f"📧 Notification email sent to {user_email} via SMTP")
+            return 200
+        return None
+
+    @staticmethod
+    def shutdown():
+        delivery_engine.close()
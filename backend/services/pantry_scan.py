@@ -0,0 +1,82 @@
+import os
+import asyncio
+from typing import Optional
+from dotenv import load_dotenv
+from services.vision_service import VisionService
+from services.image_hash_cache import ImageHashCache, dhash_gray
+from services.image_quality import assess_quality, RETAKE_MESSAGES
+from services.image_preprocess import apreprocess_image
+
+load_dotenv()
+
+BATCH_SCAN_CONCURRENCY = int(os.getenv("BATCH_SCAN_CONCURRENCY", "4"))
+
+class RetakeRequired(Exception):
+    """Raised when an upload fails the quality gate; `detail` is the structured retake response."""
+    def __init__(self, detail: dict):
+        super().__init__(", ".join(detail["reasons"]))
+        self.detail = detail
+
+class PantryScanner:
+    """
+    One upload -> canonical ingredient list: preprocess, quality gate,
+    perceptual-hash cache, then EyePop.
+    """
+    def __init__(self, image_cache: ImageHashCache = None):
+        self.image_cache = image_cache or ImageHashCache()
+        self._batch_limit = asyncio.Semaphore(BATCH_SCAN_CONCURRENCY)
+
+    async def scan(self, raw: bytes, user_id: Optional[int] = None) -> list[str]:
+        # Orient, downscale and re-encode in the process pool; no temp file
+        image = await apreprocess_image(raw)
+        print(f"🖼️ Preprocessed upload: {len(raw) // 1024} KB -> {len(image.jpeg) // 1024} KB ({image.width}x{image.height})")
+
+        # Reject hopeless photos before paying for an EyePop inference
+        quality = assess_quality(image.gray)
+        if not quality.ok:
+            print(f"📸 Rejecting upload, retake needed: {quality.reasons}")
+            raise RetakeRequired({
+                "code": "retake",
+                "reasons": quality.reasons,
+                "messages": [RETAKE_MESSAGES[r] for r in quality.reasons],
+                "scores": quality.scores
+            })
+
+        # Reuse results for the same (or nearly the same) photo from the same user.
+        # Anonymous uploads have no scope to isolate them, so they skip the cache.
+        image_hash = dhash_gray(image.gray) if user_id else None
+        if image_hash is not None:
+            ingredients = self.image_cache.lookup(user_id, image_hash)
+            if ingredients is not None:
+                print("♻️ Image matched a recent scan, skipping EyePop")
+                return ingredients
+
+        # EyePop's SDK is blocking, keep it off the event loop
+        result = await asyncio.to_thread(
+            VisionService.analyze, image.jpeg,
+            speculation_key=f"user:{user_id}" if user_id else None
+        )
+        # Receipts and labels look alike at hash resolution; only cache object-pass results
+        if image_hash is not None and result.ingredients and not result.used_text:
+            self.image_cache.add(user_id, image_hash, result.ingredients)
+        return result.ingredients
+
+    async def scan_many(self, uploads: list[tuple[str, bytes]], user_id: Optional[int] = None) -> list[dict]:
+        """
+        Scans several images concurrently. Returns one
+        {"filename", "ingredients", "retake", "error"} dict per upload, in
+        order; a rejected photo gets its retake detail, and an unreadable one
+        or a failed vision call its error, instead of failing the batch.
+        """
+        async def scan_one(filename: str, raw: bytes) -> dict:
+            async with self._batch_limit:
+                try:
+                    ingredients = await self.scan(raw, user_id)
+                    return {"filename": filename, "ingredients": ingredients, "retake": None, "error": None}
+                except RetakeRequired as e:
+                    return {"filename": filename, "ingredients": [], "retake": e.detail, "error": None}
+                except Exception as e:
+                    print(f"❌ Scan failed for {filename}: {e}")
+                    return {"filename": filename, "ingredients": [], "retake": None, "error": str(e)}
+
+        return await asyncio.gather(*[scan_one(name, raw) for name, raw in uploads])
@@ -1,25 +1,73 @@
 import os
+import queue
+import threading
+from typing import Optional
+from contextlib import contextmanager
 from googleapiclient.discovery import build
-from youtube_transcript_api import YouTubeTranscriptApi
+from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
 from dotenv import load_dotenv
+from services.cache import TTLCache
+from services.transcript_store import TranscriptStore
 
 load_dotenv()
 
+YOUTUBE_POOL_SIZE = int(os.getenv("YOUTUBE_POOL_SIZE", "6"))
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "900"))  # 15 minutes
+STATS_CACHE_SIZE = int(os.getenv("STATS_CACHE_SIZE", "5000"))
+VIDEOS_LIST_MAX_IDS = 50  # Hard limit of videos.list per request
+
 class SearchService:
-    def __init__(self):
-        self.youtube = build('youtube', 'v3', developerKey=os.getenv('YOUTUBE_API_KEY'))
+    def __init__(self, pool_size: int = YOUTUBE_POOL_SIZE, transcript_store: TranscriptStore = None):
+        # googleapiclient's httplib2 transport is not thread-safe, so every
+        # worker thread checks out its own client from this pool.
+        self._pool_size = max(1, pool_size)
+        self._clients = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._stats_cache = TTLCache(maxsize=STATS_CACHE_SIZE, ttl=STATS_CACHE_TTL)
+        self.transcripts = transcript_store or TranscriptStore()
+
+    def _build_client(self):
+        return build('youtube', 'v3', developerKey=os.getenv('YOUTUBE_API_KEY'))
+
+    @contextmanager
+    def _youtube(self):
+        """
+        Borrows a YouTube client, building one lazily until the pool is full.
+        """
+        try:
+            client = self._clients.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_build = self._created < self._pool_size
+                if can_build:
+                    self._created += 1
+            if can_build:
+                try:
+                    client = self._build_client()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                client = self._clients.get()
+        try:
+            yield client
+        finally:
+            self._clients.put(client)
 
     def search_youtube_videos(self, query: str, max_results: int = 5) -> list[dict]:
         """
         Searches YouTube for a specific query and returns detailed video info.
         """
-        request = self.youtube.search().list(
-            q=query,
-            part='snippet',
-            type='video',
-            maxResults=max_results
-        )
-        response = request.execute()
+        with self._youtube() as youtube:
+            request = youtube.search().list(
+                q=query,
+                part='snippet',
+                type='video',
+                maxResults=max_results
+            )
+            response = request.execute()
         
         videos = []
         for item in response['items']:
@@ -41,25 +89,69 @@ class SearchService:
         """
         Fetches view count and other stats for scoring.
         """
-        try:
-            request = self.youtube.videos().list(
-                part="statistics",
-                id=video_id
-            )
-            response = request.execute()
-            if response['items']:
-                return response['items'][0]['statistics']
-        except:
-            pass
-        return {}
+        return self.get_videos_stats([video_id]).get(video_id, {})
+
+    def get_videos_stats(self, video_ids: list[str]) -> dict[str, dict]:
+        """
+        Fetches statistics for many videos, 50 IDs per videos.list call.
+        Cached entries are served from memory; unknown IDs map to {}.
+        """
+        stats = self._stats_cache.get_many(video_ids)
+        missing = list(dict.fromkeys(vid for vid in video_ids if vid not in stats))
+
+        for start in range(0, len(missing), VIDEOS_LIST_MAX_IDS):
+            chunk = missing[start:start + VIDEOS_LIST_MAX_IDS]
+            try:
+                with self._youtube() as youtube:
+                    request = youtube.videos().list(
+                        part="statistics",
+                        id=",".join(chunk)
+                    )
+                    response = request.execute()
+            except Exception as e:
+                print(f"⚠️ Stats lookup failed for {len(chunk)} videos: {e}")
+                continue
+
+            found = {item['id']: item.get('statistics', {}) for item in response.get('items', [])}
+            for vid in chunk:
+                # Cache misses too, so deleted/private videos aren't re-queried
+                self._stats_cache.set(vid, found.get(vid, {}))
+                stats[vid] = found.get(vid, {})
+
+        return stats
 
     def get_video_transcript(self, video_id: str) -> str:
         """
         Fetches transcript. Returns None if not available.
         """
+        segments = self.get_transcript_segments(video_id)
+        if not segments:
+            return None
+        full_text = " ".join([entry['text'] for entry in segments])
+        return full_text[:15000] # Limit context
+
+    def get_transcript_segments(self, video_id: str) -> Optional[list[dict]]:
+        """
+        Returns the timestamped transcript segments, served from the
+        persistent TranscriptStore when possible. None if not available.
+        """
+        found, segments = self.transcripts.get(video_id)
+        if found:
+            return segments
+
         try:
             transcript = YouTubeTranscriptApi.get_transcript(video_id)
-            full_text = " ".join([entry['text'] for entry in transcript])
-            return full_text[:15000] # Limit context
+        except (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable):
+            # Definitive "no transcript": remember it (with the shorter TTL)
+            self.transcripts.put(video_id, None)
+            return None
         except Exception:
+            # Transient failure, don't cache
             return None
+
+        segments = [
+            {"text": entry['text'], "start": entry.get('start', 0.0), "duration": entry.get('duration', 0.0)}
+            for entry in transcript
+        ]
+        self.transcripts.put(video_id, segments)
+        return segments
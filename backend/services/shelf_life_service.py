@@ -0,0 +1,149 @@
+import os
+import json
+import math
+import difflib
+import threading
+from datetime import datetime
+from typing import Optional
+from dotenv import load_dotenv
+from services.ingredient_canon import canonicalize
+
+load_dotenv()
+
+SHELF_LIFE_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "shelf_life.json")
+SHELF_LIFE_LEARNED_PATH = os.getenv("SHELF_LIFE_LEARNED_PATH", "./shelf_life_learned.json")
+FUZZY_CUTOFF = 0.88
+
+VALID_STORAGE = {"refrigerate", "pantry", "freezer"}
+DEFAULT_EXPIRY = {"days": 7, "urgency": "medium", "storage": "pantry"}
+# Qualifiers that change how (and how long) something keeps; "frozen chicken"
+# must not inherit the shelf life of "chicken"
+STORAGE_QUALIFIERS = {
+    "frozen", "canned", "tinned", "jarred", "dried", "dehydrated", "powdered",
+    "smoked", "cured", "pickled", "fermented", "evaporated", "condensed",
+    "uht", "cooked", "leftover", "opened",
+    "stable",  # "shelf-stable" folds to "shelf stable" ("freeze-dried" is covered by "dried")
+}
+
+def urgency_for(days: int) -> str:
+    """Same buckets the expiry prompt asks the LLM for."""
+    if days <= 3:
+        return "high"
+    if days <= 7:
+        return "medium"
+    return "low"
+
+def days_remaining(expires_at: datetime, now: Optional[datetime] = None) -> int:
+    """Whole days left until `expires_at` (rounded up), never below 0."""
+    seconds = (expires_at - (now or datetime.utcnow())).total_seconds()
+    return max(0, math.ceil(seconds / 86400))
+
+class ShelfLifeService:
+    """
+    Local shelf-life knowledge base in front of AgentService.estimate_expiry_dates.
+    Ingredients are resolved from the bundled table (exact, then head noun
+    unless a qualifier like "frozen" changes storage, then fuzzy match); only the leftovers go to the LLM, and its answers are
+    written back to a learned overlay so the next scan finds them locally.
+    """
+    def __init__(self, table_path: str = SHELF_LIFE_TABLE_PATH, learned_path: str = SHELF_LIFE_LEARNED_PATH):
+        self.learned_path = learned_path
+        self._lock = threading.Lock()
+        with open(table_path) as f:
+            self.table = {canonicalize(k): v for k, v in json.load(f).items()}
+        self.learned = {}
+        if learned_path and os.path.exists(learned_path):
+            try:
+                with open(learned_path) as f:
+                    self.learned = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable shelf-life overlay: {e}")
+        self._keys = list(self.table) + [k for k in self.learned if k not in self.table]
+
+    def _entry(self, key: str):
+        return self.learned.get(key) or self.table.get(key)
+
+    def lookup_one(self, ingredient: str):
+        """Returns {'days', 'urgency', 'storage'} or None if unknown."""
+        key = canonicalize(ingredient)
+        entry = self._entry(key)
+        if entry is None and " " in key:
+            qualifiers, head = key.rsplit(" ", 1)
+            if not STORAGE_QUALIFIERS.intersection(qualifiers.split()):
+                # "cherokee tomato" -> "tomato"; "canned corn" is left to the LLM
+                entry = self._entry(head)
+        if entry is None:
+            match = difflib.get_close_matches(key, self._keys, n=1, cutoff=FUZZY_CUTOFF)
+            if match:
+                entry = self._entry(match[0])
+        if entry is None:
+            return None
+        return {"days": entry["days"], "urgency": urgency_for(entry["days"]), "storage": entry["storage"]}
+
+    def lookup(self, ingredients: list[str]) -> tuple[dict[str, dict], list[str]]:
+        """Splits ingredients into (known expiry info, unknown names)."""
+        known, missing = {}, []
+        for ing in ingredients:
+            info = self.lookup_one(ing)
+            if info:
+                known[ing] = info
+            else:
+                missing.append(ing)
+        return known, missing
+
+    def remember(self, answers: dict[str, dict]):
+        """Validates LLM answers and persists them to the learned overlay."""
+        added = {}
+        for name, info in answers.items():
+            try:
+                days = int(info["days"])
+                storage = str(info["storage"]).lower()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if days <= 0 or storage not in VALID_STORAGE:
+                continue
+            added[canonicalize(name)] = {"days": days, "storage": storage}
+        if not added:
+            return
+
+        with self._lock:
+            self.learned.update(added)
+            self._keys = list(self.table) + [k for k in self.learned if k not in self.table]
+            if self.learned_path:
+                tmp_path = f"{self.learned_path}.tmp"
+                try:
+                    with open(tmp_path, "w") as f:
+                        json.dump(self.learned, f, indent=2, sort_keys=True)
+                    os.replace(tmp_path, self.learned_path)
+                except OSError as e:
+                    print(f"⚠️ Could not persist shelf-life overlay: {e}")
+
+    async def aestimate(self, ingredients: list[str], agent_service) -> dict[str, dict]:
+        """
+        Expiry info for every ingredient, asking the LLM only about the ones
+        the knowledge base doesn't cover.
+        """
+        known, missing = self.lookup(ingredients)
+        print(f"📚 Shelf-life table covered {len(known)}/{len(ingredients)} ingredients")
+        if not missing:
+            return known
+
+        try:
+            answers = await agent_service.aestimate_expiry_dates(missing, fallback=False)
+        except Exception as e:
+            print(f"❌ Expiry estimation error: {e}")
+            answers = {}
+
+        by_key = {canonicalize(k): v for k, v in answers.items() if isinstance(v, dict)}
+        learned = {}
+        for ing in missing:
+            info = by_key.get(canonicalize(ing))
+            if info:
+                learned[ing] = info
+        self.remember(learned)
+
+        for ing in missing:
+            # Re-read through the table so stored answers are validated the same way
+            known[ing] = self.lookup_one(ing) if ing in learned else None
+            if known[ing] is None:
+                known[ing] = dict(DEFAULT_EXPIRY)
+        return known
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRANSCRIPT_DB_PATH = os.getenv("TRANSCRIPT_DB_PATH", "./transcript_cache.db")
+TRANSCRIPT_TTL = int(os.getenv("TRANSCRIPT_TTL", str(30 * 24 * 3600)))  # 30 days
+TRANSCRIPT_NEGATIVE_TTL = int(os.getenv("TRANSCRIPT_NEGATIVE_TTL", str(24 * 3600)))  # 1 day
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+class TranscriptStore:
+    """
+    Persistent transcript cache keyed by video ID, stored in its own SQLite file.
+    Segment lists (text + timestamps) are kept as zlib-compressed JSON; a NULL
+    body records "no transcript" and expires after the shorter negative TTL.
+    Once the compressed bodies exceed `max_bytes`, least recently read
+    entries are evicted.
+    """
+    def __init__(
+        self,
+        path: str = TRANSCRIPT_DB_PATH,
+        ttl: int = TRANSCRIPT_TTL,
+        negative_ttl: int = TRANSCRIPT_NEGATIVE_TTL,
+        max_bytes: int = TRANSCRIPT_CACHE_MAX_BYTES,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            " video_id TEXT PRIMARY KEY,"
+            " body BLOB,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_transcripts_last_access ON transcripts (last_access)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+
+    def get(self, video_id: str) -> tuple[bool, Optional[list[dict]]]:
+        """
+        Returns (found, segments). `found` with `segments` None is a cached
+        "no transcript" answer.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, size, expires_at FROM transcripts WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if not row:
+                return False, None
+            body, size, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM transcripts WHERE video_id = ?", (video_id,))
+                self._total_bytes -= size
+                return False, None
+            self._conn.execute("UPDATE transcripts SET last_access = ? WHERE video_id = ?", (now, video_id))
+
+        if body is None:
+            return True, None
+        return True, json.loads(zlib.decompress(body))
+
+    def put(self, video_id: str, segments: Optional[list[dict]]):
+        now = time.time()
+        if segments is None:
+            body, ttl = None, self.negative_ttl
+        else:
+            body, ttl = zlib.compress(json.dumps(segments, separators=(",", ":")).encode("utf-8"), 6), self.ttl
+        size = len(body) if body else 0
+
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM transcripts WHERE video_id = ?", (video_id,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts (video_id, body, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (video_id, body, size, now + ttl, now)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drops least recently read entries until under ~90% of the cap. Caller holds the lock."""
+        target = int(self.max_bytes * 0.9)
+        self._conn.execute("DELETE FROM transcripts WHERE expires_at <= ?", (time.time(),))
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT video_id, size FROM transcripts ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for video_id, size in rows:
+                victims.append((video_id,))
+                self._total_bytes -= size
+                if self._total_bytes <= target:
+                    break
+            self._conn.executemany("DELETE FROM transcripts WHERE video_id = ?", victims)
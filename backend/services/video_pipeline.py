@@ -0,0 +1,174 @@
+import os
+import asyncio
+from schemas import VideoResult
+
+# Per-stage concurrency limits
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "3"))
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "6"))
+GUIDE_CONCURRENCY = int(os.getenv("GUIDE_CONCURRENCY", "3"))
+
+class VideoPipeline:
+    """
+    Staged fan-out behind /api/find-videos: search -> fetch & score -> guides.
+    Each stage is bounded by its own semaphore and keeps results in input
+    order. Blocking YouTube calls run in worker threads; guides use the
+    AgentService async API.
+    """
+    def __init__(self, agent_service, search_service):
+        self.agent_service = agent_service
+        self.search_service = search_service
+        self._search_limit = asyncio.Semaphore(SEARCH_CONCURRENCY)
+        self._fetch_limit = asyncio.Semaphore(FETCH_CONCURRENCY)
+        self._guide_limit = asyncio.Semaphore(GUIDE_CONCURRENCY)
+
+    @staticmethod
+    async def _run(limit: asyncio.Semaphore, fn, *args, **kwargs):
+        async with limit:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def search(self, queries: list[str], max_results: int = 2) -> list[dict]:
+        """
+        Runs all queries concurrently and dedupes videos in query order.
+        """
+        batches = await asyncio.gather(*[
+            self._run(self._search_limit, self.search_service.search_youtube_videos, q, max_results=max_results)
+            for q in queries
+        ])
+
+        seen_ids = set()
+        raw_videos = []
+        for videos in batches:
+            for v in videos:
+                if v['id'] not in seen_ids:
+                    seen_ids.add(v['id'])
+                    raw_videos.append(v)
+        return raw_videos
+
+    async def score(self, raw_videos: list[dict], channel_filter: str = None) -> list[dict]:
+        """
+        Fetches every transcript concurrently, alongside one batched stats
+        lookup for all videos, and scores them.
+        """
+        stats_by_id, transcripts = await asyncio.gather(
+            self._run(self._fetch_limit, self.search_service.get_videos_stats, [v['id'] for v in raw_videos]),
+            asyncio.gather(*[
+                self._run(self._fetch_limit, self.search_service.get_video_transcript, v['id'])
+                for v in raw_videos
+            ])
+        )
+        candidates = []
+        for idx, (video, transcript) in enumerate(zip(raw_videos, transcripts), 1):
+            print(f"   [{idx}/{len(raw_videos)}] Checking: {video['title'][:60]}...")
+            candidates.append(self._score_video(video, transcript, stats_by_id.get(video['id'], {}), channel_filter))
+        return candidates
+
+    @staticmethod
+    def _score_video(video: dict, transcript: str, stats: dict, channel_filter: str = None) -> dict:
+        # Content for the LLM: Transcript > Description
+        description = video['description']
+        content_for_llm = transcript if transcript else description
+        source_type = "transcript" if transcript else "description"
+
+        # VERIFICATION TEMPORARILY DISABLED - Ollama JSON parsing issues
+        # verification = agent_service.verify_video(
+        #     video['title'], content_for_llm,
+        #     request.selected_recipe, request.ingredients
+        # )
+
+        # For now, accept all videos with a default confidence
+        verification = {
+            "valid": True,
+            "reason": "Verification disabled - accepting all results",
+            "confidence_score": 70  # Default confidence
+        }
+
+        views = int(stats.get('viewCount', 0)) if stats else 0
+
+        # Normalize views (log scale primitive approximation)
+        # Cap at 1M for normalization 1.0
+        norm_views = min(views / 1_000_000, 1.0)
+
+        # Channel similarity (simple check)
+        channel_score = 1.0 if channel_filter and channel_filter.lower() in video['channel'].lower() else 0.0
+
+        conf_score = float(verification.get('confidence_score', 50)) / 100.0
+
+        # Weighted Score
+        # Relevance (0.5) + Views (0.3) + Channel (0.2)
+        smart_score = (conf_score * 50) + (norm_views * 30) + (channel_score * 20)
+
+        return {
+            "data": video,
+            "score": smart_score,
+            "valid": verification.get('valid'),
+            "reason": verification.get('reason'),
+            "views": views,
+            "content_for_llm": content_for_llm,
+            "source_type": source_type
+        }
+
+    @staticmethod
+    def rank(candidates: list[dict], top_n: int = 3) -> list[dict]:
+        valid = [c for c in candidates if c['valid']]
+        valid.sort(key=lambda x: x['score'], reverse=True)
+        return valid[:top_n]
+
+    async def generate_guides(self, candidates: list[dict]) -> list[str]:
+        """
+        Generates the accessible guide for every candidate concurrently.
+        """
+        async def generate(c: dict) -> str:
+            async with self._guide_limit:
+                return await self.agent_service.agenerate_accessible_guide(
+                    c['data']['title'],
+                    c['content_for_llm'],
+                    c['source_type']
+                )
+
+        return await asyncio.gather(*[generate(c) for c in candidates])
+
+    async def stream_guides(self, candidates: list[dict]):
+        """
+        Streams every candidate's guide concurrently, yielding
+        (index, kind, text) as chunks arrive. kind is "delta", "done" or "error".
+        """
+        events = asyncio.Queue()
+
+        async def pump(index: int, c: dict):
+            try:
+                async with self._guide_limit:
+                    async for delta in self.agent_service.astream_accessible_guide(
+                        c['data']['title'],
+                        c['content_for_llm'],
+                        c['source_type']
+                    ):
+                        await events.put((index, "delta", delta))
+                await events.put((index, "done", None))
+            except Exception as e:
+                await events.put((index, "error", str(e)))
+
+        tasks = [asyncio.create_task(pump(i, c)) for i, c in enumerate(candidates)]
+        try:
+            pending = len(tasks)
+            while pending:
+                event = await events.get()
+                if event[1] != "delta":
+                    pending -= 1
+                yield event
+        finally:
+            # Client went away (or we finished): stop any in-flight generation
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def to_result(candidate: dict, guide: str = None) -> VideoResult:
+        return VideoResult(
+            title=candidate['data']['title'],
+            url=candidate['data']['url'],
+            thumbnail=candidate['data']['thumbnail'],
+            channel=candidate['data']['channel'],
+            views=str(candidate['views']),
+            smart_score=round(candidate['score'], 1),
+            accessible_guide=guide,
+            match_reason=candidate['reason']
+        )
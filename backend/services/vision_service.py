@@ -1,97 +1,183 @@
 import os
+import io
 import time
-import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional, Union
 from dotenv import load_dotenv
-from eyepop import EyePopSdk
 from eyepop.worker.worker_types import Pop, InferenceComponent
+from services.eyepop_pool import EyePopEndpointPool, EYEPOP_POOL_SIZE
+from services.ingredient_canon import canonicalize, canonicalize_all
 
 load_dotenv()
 api_key = os.getenv("EYEPOP_API_KEY")
 
+# off: text detection only after a low-confidence object pass
+# always: run both inferences concurrently on every scan
+# auto: run both concurrently when this user's scans usually need the text pass
+EYEPOP_SPECULATION = os.getenv("EYEPOP_SPECULATION", "off").lower()
+
+OBJECT_PROMPT = (
+    "Analyze the image. "
+    "Ignore people, faces, hands, body parts, and human features. "
+    "Ignore background objects not related to items or products. "
+    "If the image is a bill or receipt, list the items on the bill. "
+    "If the image is of a shelf or store display, list the products visible. "
+    "If the image is of a single product, list that product only. "
+    "If the image is unclear or contains no items, respond with NO OBJECTS DETECTED. "
+    "Otherwise, detect and list only physical items or products visible. "
+    "Do not include humans or body parts as objects. "
+    "Use clear class labels only. "
+    "If unsure, set classLabel to null."
+)
+
+TEXT_PROMPT = (
+    "Detect readable text in the image. "
+    "If this is a bill or receipt, extract item names only. "
+    "Ignore totals, prices, tax, people, and background text."
+)
+
+# Each pooled endpoint stays pinned to one of these pops
+POPS = {
+    "objects": Pop(components=[
+        InferenceComponent(
+            id=1,
+            ability="eyepop.image-contents:latest",
+            params={"prompts": [{"prompt": OBJECT_PROMPT}]}
+        )
+    ]),
+    "text": Pop(components=[
+        InferenceComponent(
+            id=2,
+            ability="eyepop.text-detection:latest",
+            params={"prompts": [{"prompt": TEXT_PROMPT}]}
+        )
+    ]),
+}
+
+endpoint_pool = EyePopEndpointPool(api_key, POPS)
+_speculation_executor = ThreadPoolExecutor(max_workers=EYEPOP_POOL_SIZE, thread_name_prefix="eyepop-text")
+
+class SpeculationPolicy:
+    """
+    Learns, per key (user), how often scans end up needing the text
+    fallback, as an EWMA. Speculating pays off once that rate is high:
+    the text pass is then usually needed anyway and we save a round trip.
+    """
+    def __init__(self, threshold: float = 0.5, alpha: float = 0.3, prior: float = 0.25, max_keys: int = 10000):
+        self.threshold = threshold
+        self.alpha = alpha
+        self.prior = prior
+        self.max_keys = max_keys
+        self._rates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def should_speculate(self, key: str) -> bool:
+        with self._lock:
+            return self._rates.get(key, self.prior) >= self.threshold
+
+    def record(self, key: str, needed_fallback: bool):
+        with self._lock:
+            rate = self._rates.pop(key, self.prior)
+            self._rates[key] = self.alpha * float(needed_fallback) + (1 - self.alpha) * rate
+            while len(self._rates) > self.max_keys:
+                self._rates.popitem(last=False)
+
+speculation_policy = SpeculationPolicy()
+
+class VisionResult(NamedTuple):
+    ingredients: list
+    used_text: bool  # the text (receipt/label) pass contributed to the result
+
 class VisionService:
     @staticmethod
-    def analyze_image(image_path: str) -> list[str]:
+    def warm_up():
+        if api_key:
+            endpoint_pool.warm()
+
+    @staticmethod
+    def shutdown():
+        endpoint_pool.close()
+
+    @staticmethod
+    def analyze_image(image: Union[str, bytes], speculation_key: Optional[str] = None) -> list[str]:
+        """
+        `image` is a file path or encoded JPEG bytes (streamed to EyePop
+        without touching disk).
+        """
+        return VisionService.analyze(image, speculation_key).ingredients
+
+    @staticmethod
+    def analyze(image: Union[str, bytes], speculation_key: Optional[str] = None) -> VisionResult:
+        """Like analyze_image, but also reports whether the text pass was used."""
         if not api_key:
             raise RuntimeError("EYEPOP_API_KEY not found in environment")
 
-        prompt = (
-            "Analyze the image. "
-            "Ignore people, faces, hands, body parts, and human features. "
-            "Ignore background objects not related to items or products. "
-            "If the image is a bill or receipt, list the items on the bill. "
-            "If the image is of a shelf or store display, list the products visible. "
-            "If the image is of a single product, list that product only. "
-            "If the image is unclear or contains no items, respond with NO OBJECTS DETECTED. "
-            "Otherwise, detect and list only physical items or products visible. "
-            "Do not include humans or body parts as objects. "
-            "Use clear class labels only. "
-            "If unsure, set classLabel to null."
+        policy_key = speculation_key or "anonymous"
+        speculate = EYEPOP_SPECULATION == "always" or (
+            EYEPOP_SPECULATION == "auto" and speculation_policy.should_speculate(policy_key)
         )
+        text_future = None
+        if speculate:
+            # Start text detection now; it runs alongside the object pass
+            text_future = _speculation_executor.submit(VisionService._safe_predict, "text", image)
 
-        with EyePopSdk.workerEndpoint(api_key=api_key) as endpoint:
-            # 1. Object Detection
-            endpoint.set_pop(
-                Pop(components=[
-                    InferenceComponent(
-                        id=1,
-                        ability="eyepop.image-contents:latest",
-                        params={"prompts": [{"prompt": prompt}]}
-                    )
-                ])
-            )
-
-            result = VisionService._safe_predict(endpoint, image_path)
-            filtered_items = VisionService._filter_classes(result)
-
-            # 2. Text Fallback Logic
-            if VisionService._needs_text_fallback(filtered_items):
+        # 1. Object Detection
+        try:
+            result = VisionService._safe_predict("objects", image)
+        except Exception:
+            if text_future:
+                text_future.cancel()
+            raise
+        filtered_items = VisionService._filter_classes(result)
+
+        # 2. Text Fallback Logic
+        needs_text = VisionService._needs_text_fallback(filtered_items)
+        speculation_policy.record(policy_key, needs_text)
+        if text_future and not needs_text:
+            # Speculation didn't pay off this time; drop the result
+            text_future.cancel()
+        if needs_text:
+            if text_future:
+                print("🔁 Using speculative text detection result...")
+                text_result = text_future.result()
+            else:
                 print("🔁 Running text detection fallback...")
-                endpoint.set_pop(
-                    Pop(components=[
-                        InferenceComponent(
-                            id=2,
-                            ability="eyepop.text-detection:latest",
-                            params={
-                                "prompts": [
-                                    {
-                                        "prompt": (
-                                            "Detect readable text in the image. "
-                                            "If this is a bill or receipt, extract item names only. "
-                                            "Ignore totals, prices, tax, people, and background text."
-                                        )
-                                    }
-                                ]
-                            }
-                        )
-                    ])
-                )
-                text_result = VisionService._safe_predict(endpoint, image_path)
-                text_items = VisionService._normalize_text_result(text_result)
-                
-                # Merge
-                combined = filtered_items + text_items
-                seen = set()
-                final_items = []
-                for item in combined:
-                    key = item["classlabel"]
-                    if key and key not in seen:
-                        seen.add(key)
-                        final_items.append(item)
-                filtered_items = final_items
-
-        # Extract just the labels
-        ingredients = [item['classlabel'] for item in filtered_items if item.get('classlabel')]
-        return ingredients
+                text_result = VisionService._safe_predict("text", image)
+            text_items = VisionService._normalize_text_result(text_result)
+            
+            # Merge
+            combined = filtered_items + text_items
+            seen = set()
+            final_items = []
+            for item in combined:
+                # Dedupe on the canonical name so "Tomatoes" and "tomato" merge
+                key = canonicalize(item["classlabel"])
+                if key and key not in seen:
+                    seen.add(key)
+                    final_items.append(item)
+            filtered_items = final_items
+
+        # Extract just the labels, canonicalized
+        ingredients = canonicalize_all(item.get('classlabel') for item in filtered_items)
+        return VisionResult(ingredients, needs_text)
 
     @staticmethod
-    def _safe_predict(endpoint, image_path, retries=1):
+    def _safe_predict(pop_name, image, retries=1):
         try:
-            return endpoint.upload(image_path).predict()
+            with endpoint_pool.endpoint(pop_name) as endpoint:
+                if isinstance(image, (bytes, bytearray)):
+                    job = endpoint.upload_stream(io.BytesIO(image), "image/jpeg")
+                else:
+                    job = endpoint.upload(image)
+                return job.predict()
         except Exception as e:
             if retries > 0:
+                # The failed endpoint was dropped; the retry gets a fresh connection
                 print("⚠️ EyePop error, retrying once after delay...")
                 time.sleep(3)
-                return VisionService._safe_predict(endpoint, image_path, retries - 1)
+                return VisionService._safe_predict(pop_name, image, retries - 1)
             raise e
 
     @staticmethod
@@ -0,0 +1,192 @@
+import os
+import time
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import update, or_, and_, func
+from sqlalchemy.future import select
+from database import AsyncSessionLocal
+from models.db_models import NotificationOutbox
+from services.notification_service import NotificationService, SMTP_POOL_SIZE
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))  # seconds, when the outbox is empty
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "300"))  # claimed rows return after this
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETRY_BACKOFF = int(os.getenv("OUTBOX_RETRY_BACKOFF", "60"))  # seconds, doubled per attempt
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", str(SMTP_POOL_SIZE * 2)))
+
+async def send_expiry_digest(row: NotificationOutbox) -> bool:
+    # The idempotency key doubles as Message-ID so a redelivered digest can be deduplicated downstream
+    message_id = f"<{row.idempotency_key.replace(':', '.')}@snapchef>"
+    return bool(await NotificationService.asend_expiry_email(
+        row.recipient, row.payload["name"], row.payload["items"], message_id
+    ))
+
+SENDERS = {"expiry_digest": send_expiry_digest}
+
+class OutboxDispatcher:
+    """
+    Drains notification_outbox in batches. A batch is claimed by stamping
+    a lease token and expiry on due rows, so several dispatchers (or a
+    restarted one) never send the same row concurrently; rows whose lease
+    runs out are picked up again. Failed sends go back to pending with
+    exponential backoff until OUTBOX_MAX_ATTEMPTS, then stay `failed`.
+    Delivery is at-least-once: a crash between sending and recording the
+    result resends that digest after the lease expires.
+    """
+    def __init__(self, session_factory=AsyncSessionLocal, senders: dict = None, batch_size: int = OUTBOX_BATCH_SIZE,
+                 concurrency: int = OUTBOX_CONCURRENCY, lease_seconds: int = OUTBOX_LEASE_SECONDS,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS, backoff: int = OUTBOX_RETRY_BACKOFF,
+                 poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.session_factory = session_factory
+        self.senders = senders or SENDERS
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self._limit = asyncio.Semaphore(concurrency)
+        self._task = None
+        # Metrics
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_batch_seconds = 0.0
+        self._started_at = None
+
+    def _claimable(self, now: datetime):
+        return or_(
+            and_(NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= now),
+            and_(NotificationOutbox.status == "sending", NotificationOutbox.locked_until <= now)
+        )
+
+    def claim_statement(self, now: datetime, token: str):
+        """UPDATE that leases up to batch_size due rows to `token`."""
+        due = (
+            select(NotificationOutbox.id)
+            .where(self._claimable(now))
+            .order_by(NotificationOutbox.next_attempt_at)
+            .limit(self.batch_size)
+        )
+        # Re-check claimability in the UPDATE so a row claimed by someone else in between is skipped
+        return (
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(due.scalar_subquery()), self._claimable(now))
+            .values(
+                status="sending",
+                lease_token=token,
+                locked_until=now + timedelta(seconds=self.lease_seconds),
+                attempts=NotificationOutbox.attempts + 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def claim_batch(self) -> list[NotificationOutbox]:
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        async with self.session_factory() as db:
+            await db.execute(self.claim_statement(now, token))
+            await db.commit()
+            result = await db.execute(select(NotificationOutbox).where(NotificationOutbox.lease_token == token))
+            return result.scalars().all()
+
+    async def _deliver(self, row: NotificationOutbox) -> tuple[bool, str]:
+        sender = self.senders.get(row.kind)
+        if sender is None:
+            return False, f"No sender for kind '{row.kind}'"
+        async with self._limit:
+            try:
+                return await sender(row), None
+            except Exception as e:
+                return False, str(e)
+
+    async def _record(self, rows: list[NotificationOutbox], outcomes: list[tuple[bool, str]]):
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            for row, (ok, error) in zip(rows, outcomes):
+                # Only the lease holder may record an outcome
+                owned = and_(NotificationOutbox.id == row.id, NotificationOutbox.lease_token == row.lease_token)
+                if ok:
+                    values = {"status": "sent", "sent_at": now, "last_error": None}
+                    self.sent += 1
+                elif row.attempts >= self.max_attempts:
+                    values = {"status": "failed", "last_error": error or "Send failed"}
+                    self.failed += 1
+                else:
+                    delay = self.backoff * (2 ** (row.attempts - 1))
+                    values = {"status": "pending", "next_attempt_at": now + timedelta(seconds=delay), "last_error": error or "Send failed"}
+                    self.retried += 1
+                values.update(lease_token=None, locked_until=None)
+                await db.execute(update(NotificationOutbox).where(owned).values(**values).execution_options(synchronize_session=False))
+            await db.commit()
+
+    async def dispatch_once(self) -> int:
+        """Claims, sends and records one batch. Returns how many rows it handled."""
+        started = time.monotonic()
+        rows = await self.claim_batch()
+        if not rows:
+            return 0
+        outcomes = await asyncio.gather(*[self._deliver(row) for row in rows])
+        await self._record(rows, outcomes)
+        self.batches += 1
+        self.last_batch_size = len(rows)
+        self.last_batch_seconds = time.monotonic() - started
+        print(f"📬 Outbox batch: {len(rows)} digests in {self.last_batch_seconds:.2f}s "
+              f"({len(rows) / max(self.last_batch_seconds, 1e-6):.1f}/s), totals sent={self.sent} retried={self.retried} failed={self.failed}")
+        return len(rows)
+
+    async def drain(self) -> int:
+        """Dispatches batches until nothing is due."""
+        total = 0
+        while True:
+            handled = await self.dispatch_once()
+            if not handled:
+                return total
+            total += handled
+
+    async def _run(self):
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                print(f"❌ Outbox dispatch failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._started_at = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+            print("📬 Outbox dispatcher started.")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def backlog(self) -> dict:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(NotificationOutbox.status, func.count()).group_by(NotificationOutbox.status)
+            )
+            return dict(result.all())
+
+    def snapshot(self) -> dict:
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_seconds": round(self.last_batch_seconds, 3),
+            "sent_per_second": round(self.sent / uptime, 2) if uptime else 0.0,
+        }
+
+outbox_dispatcher = OutboxDispatcher()
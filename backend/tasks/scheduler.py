@@ -1,39 +1,106 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from sqlalchemy.future import select
 from datetime import datetime, timedelta
-from database import AsyncSessionLocal
-from models.db_models import User, PantryItem
-from services.notification_service import NotificationService
-import asyncio
+from database import AsyncSessionLocal, dialect_insert
+from models.db_models import User, PantryItem, NotificationOutbox
+from services.shelf_life_service import days_remaining, urgency_for
+import os
 
 scheduler = AsyncIOScheduler()
 
-async def check_expiring_ingredients():
+EXPIRY_WARNING_DAYS = 2
+EXPIRY_GRACE_DAYS = int(os.getenv("EXPIRY_GRACE_DAYS", "1"))  # keep mentioning items this long after they expire
+EXPIRY_CHECK_CHUNK_SIZE = int(os.getenv("EXPIRY_CHECK_CHUNK_SIZE", "1000"))  # rows per fetch
+
+def _expiring_items_query(since: datetime, cutoff: datetime):
+    """
+    One join over users and their items expiring between `since` and
+    `cutoff`, grouped by user through ordering. The lower bound stops
+    long-expired items from being mailed every day.
+    """
+    return (
+        select(
+            User.id, User.email, User.full_name,
+            PantryItem.ingredient_name, PantryItem.expires_at,
+            PantryItem.storage
+        )
+        .join(PantryItem, PantryItem.user_id == User.id)
+        .where(PantryItem.expires_at >= since, PantryItem.expires_at <= cutoff)
+        .order_by(User.id, PantryItem.expires_at)
+    )
+
+async def iter_expiring_by_user(db, chunk_size: int = EXPIRY_CHECK_CHUNK_SIZE):
+    """
+    Streams the join in `chunk_size` row chunks and yields
+    (user_id, email, full_name, items) once per user, so only one user's
+    items are ever held in memory.
+    """
+    now = datetime.utcnow()
+    stmt = _expiring_items_query(now - timedelta(days=EXPIRY_GRACE_DAYS), now + timedelta(days=EXPIRY_WARNING_DAYS))
+    result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+    current_id, current_user, items = None, None, []
+    async for row in result:
+        if row.id != current_id:
+            if items:
+                yield current_id, current_user[0], current_user[1], items
+            current_id, current_user, items = row.id, (row.email, row.full_name), []
+        days = days_remaining(row.expires_at, now)
+        items.append({
+            "name": row.ingredient_name,
+            "days": days,
+            "urgency": urgency_for(days),
+            "storage": row.storage
+        })
+    if items:
+        yield current_id, current_user[0], current_user[1], items
+
+async def _enqueue_digests(session_factory, rows: list[dict]) -> int:
+    """
+    Bulk-inserts outbox rows in their own short transaction; a digest
+    already queued for that user today is left alone.
+    """
+    async with session_factory() as db:
+        # Core insert on the table: the ORM bulk path returns a result without rowcount
+        stmt = dialect_insert(db, NotificationOutbox.__table__).on_conflict_do_nothing(index_elements=["idempotency_key"])
+        result = await db.execute(stmt, rows)
+        await db.commit()
+    return max(result.rowcount, 0)
+
+async def check_expiring_ingredients(session_factory=AsyncSessionLocal, chunk_size: int = EXPIRY_CHECK_CHUNK_SIZE) -> int:
+    """
+    Decides who gets an expiry digest today and writes one notification_outbox
+    row per user, in bulk. Each chunk is written and committed on its own
+    session while the join keeps streaming (WAL lets the two overlap), so
+    the SQLite write lock is never held for the whole run; the per-day
+    idempotency key makes a partial run safe to repeat. Delivery is left to
+    tasks.outbox_dispatcher. Re-running on the same day enqueues nothing new.
+    Returns the number of digests enqueued.
+    """
     print("🕒 Running daily expiry check...")
-    async with AsyncSessionLocal() as db:
-        # Get all users
-        result = await db.execute(select(User))
-        users = result.scalars().all()
-        
-        for user in users:
-            # Find items expiring in <= 2 days
-            stmt = select(PantryItem).where(
-                PantryItem.user_id == user.id,
-                PantryItem.days_until_expiry <= 2
-            )
-            item_result = await db.execute(stmt)
-            expiring_items = item_result.scalars().all()
-            
-            if expiring_items:
-                items_data = [
-                    {
-                        "name": item.ingredient_name,
-                        "days": item.days_until_expiry,
-                        "urgency": item.urgency,
-                        "storage": item.storage
-                    } for item in expiring_items
-                ]
-                NotificationService.send_expiry_email(user.email, user.full_name, items_data)
+    now = datetime.utcnow()
+    today = now.date().isoformat()
+    enqueued = 0
+    rows = []
+    async with session_factory() as db:
+        async for user_id, email, full_name, items in iter_expiring_by_user(db, chunk_size):
+            rows.append({
+                "idempotency_key": f"expiry:{user_id}:{today}",
+                "user_id": user_id,
+                "kind": "expiry_digest",
+                "recipient": email,
+                "payload": {"name": full_name, "items": items},
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now
+            })
+            if len(rows) >= chunk_size:
+                enqueued += await _enqueue_digests(session_factory, rows)
+                rows = []
+        if rows:
+            enqueued += await _enqueue_digests(session_factory, rows)
+    print(f"🕒 Expiry check done: {enqueued} digests enqueued")
+    return enqueued
 
 def start_scheduler():
     # Schedule for 9:00 AM every day
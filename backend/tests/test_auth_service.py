@@ -0,0 +1,39 @@
+import json
+import base64
+import pytest
+from services.auth_service import GoogleTokenVerifier
+
+class FakeResponse:
+    headers = {"Cache-Control": "public, max-age=3600"}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"known-kid": "-----BEGIN CERTIFICATE-----\n-----END CERTIFICATE-----\n"}
+
+class FakeSession:
+    def get(self, url, timeout=None):
+        return FakeResponse()
+
+def _segment(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+def _token(kid: str) -> str:
+    return ".".join([_segment({"alg": "RS256", "kid": kid}), _segment({"iss": "accounts.google.com"}), "c2ln"])
+
+def test_unknown_kid_refreshes_at_most_once_per_interval():
+    verifier = GoogleTokenVerifier(certs_url="http://certs", client_id="client", session=FakeSession())
+    verifier.certs()
+    verifier._fetched_at -= 3600  # initial fetch is long past
+
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            verifier.verify(_token("forged-kid"))
+    # One forced refresh for the first token, the rest are rejected from cache
+    assert verifier.fetches == 2
+
+    verifier._fetched_at -= 3600
+    with pytest.raises(ValueError):
+        verifier.verify(_token("forged-kid"))
+    assert verifier.fetches == 3
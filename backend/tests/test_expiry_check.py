@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from database import Base, configure_sqlite
+from models.db_models import User, PantryItem, NotificationOutbox
+from tasks.scheduler import check_expiring_ingredients
+
+def _session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    configure_sqlite(engine)  # WAL, as in production
+    return engine, sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+async def _seed(engine, session_factory):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    now = datetime.utcnow()
+    async with session_factory() as db:
+        db.add_all([
+            User(id=1, email="a@example.com", full_name="A", google_id="g1"),
+            User(id=2, email="b@example.com", full_name="B", google_id="g2"),
+            PantryItem(user_id=1, ingredient_name="milk", scan_date=now, days_until_expiry=1,
+                       expires_at=now + timedelta(days=1), urgency="high", storage="refrigerate"),
+            PantryItem(user_id=1, ingredient_name="yogurt", scan_date=now - timedelta(days=30), days_until_expiry=10,
+                       expires_at=now - timedelta(days=20), urgency="high", storage="refrigerate"),
+            PantryItem(user_id=2, ingredient_name="rice", scan_date=now, days_until_expiry=300,
+                       expires_at=now + timedelta(days=300), urgency="low", storage="pantry"),
+        ])
+        await db.commit()
+
+def test_enqueues_one_digest_per_user_once_per_day(tmp_path):
+    async def run():
+        engine, session_factory = _session_factory(tmp_path)
+        await _seed(engine, session_factory)
+
+        assert await check_expiring_ingredients(session_factory) == 1
+        # Same day again: the idempotency key suppresses a second digest
+        assert await check_expiring_ingredients(session_factory) == 0
+
+        async with session_factory() as db:
+            rows = (await db.execute(select(NotificationOutbox))).scalars().all()
+            assert len(rows) == 1
+            assert rows[0].recipient == "a@example.com"
+            assert [item["name"] for item in rows[0].payload["items"]] == ["milk"]
+            assert (await db.execute(select(func.count()).select_from(NotificationOutbox))).scalar() == 1
+        await engine.dispose()
+
+    asyncio.run(run())
+
+def test_commits_each_chunk_while_streaming(tmp_path):
+    async def run():
+        engine, session_factory = _session_factory(tmp_path)
+        await _seed(engine, session_factory)
+        now = datetime.utcnow()
+        async with session_factory() as db:
+            db.add_all([
+                User(id=3, email="c@example.com", full_name="C", google_id="g3"),
+                PantryItem(user_id=3, ingredient_name="bread", scan_date=now, days_until_expiry=1,
+                           expires_at=now + timedelta(days=1), urgency="high", storage="pantry"),
+            ])
+            await db.commit()
+
+        # One digest per chunk, each written by its own transaction mid-stream
+        assert await check_expiring_ingredients(session_factory, chunk_size=1) == 2
+        async with session_factory() as db:
+            recipients = (await db.execute(select(NotificationOutbox.recipient).order_by(NotificationOutbox.user_id))).scalars().all()
+            assert recipients == ["a@example.com", "c@example.com"]
+        await engine.dispose()
+
+    asyncio.run(run())
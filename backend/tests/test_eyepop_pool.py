@@ -0,0 +1,103 @@
+import threading
+import pytest
+from services.eyepop_pool import EyePopEndpointPool, PooledEndpoint
+
+class FakeEndpoint:
+    def __init__(self):
+        self.healthy = True
+        self.probes = 0
+        self.connected = True
+
+    def set_pop(self, pop):
+        self.probes += 1
+        if not self.healthy:
+            raise ConnectionError("worker gone")
+
+    def disconnect(self):
+        self.connected = False
+
+def _pool(size: int = 1, acquire_timeout: float = 5) -> EyePopEndpointPool:
+    pool = EyePopEndpointPool("key", {"food": "pop"}, size=size, acquire_timeout=acquire_timeout, keepalive_interval=60)
+    pool.opened = 0
+    def _open(pop_name):
+        pool.opened += 1
+        return PooledEndpoint(FakeEndpoint(), pop_name)
+    pool._open = _open
+    return pool
+
+def test_discarded_endpoint_wakes_a_waiter():
+    pool = _pool(size=1)
+    holding, waiting_done = threading.Event(), threading.Event()
+
+    def failing_scan():
+        with pytest.raises(RuntimeError):
+            with pool.endpoint("food"):
+                holding.set()
+                # Give the waiter time to block on the full pool
+                waiting_done.wait(0.2)
+                raise RuntimeError("connection reset")
+
+    def waiting_scan():
+        holding.wait()
+        with pool.endpoint("food"):
+            pass
+        waiting_done.set()
+
+    threads = [threading.Thread(target=failing_scan), threading.Thread(target=waiting_scan)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert waiting_done.is_set()
+    assert pool.opened == 2
+    assert pool._created["food"] == 1
+
+def test_acquire_times_out_when_pool_is_exhausted():
+    pool = _pool(size=1, acquire_timeout=0.05)
+    with pool.endpoint("food"):
+        with pytest.raises(TimeoutError):
+            with pool.endpoint("food"):
+                pass
+
+def test_returned_endpoint_is_reused():
+    pool = _pool(size=2)
+    with pool.endpoint("food") as first:
+        pass
+    with pool.endpoint("food") as second:
+        pass
+    assert first is second
+    assert pool.opened == 1
+
+def test_keepalive_probes_idle_endpoints_and_keeps_them_warm():
+    pool = _pool(size=1)
+    with pool.endpoint("food") as endpoint:
+        pass
+    pool._idle["food"][0].last_used -= 120
+
+    pool.check_idle()
+    assert endpoint.probes == 1
+    # Probed endpoints count as fresh: the next scan reuses it without reopening
+    with pool.endpoint("food") as reused:
+        pass
+    assert reused is endpoint and pool.opened == 1
+
+def test_keepalive_reconnects_an_endpoint_that_fails_its_probe():
+    pool = _pool(size=1)
+    with pool.endpoint("food") as endpoint:
+        pass
+    endpoint.healthy = False
+    pool._idle["food"][0].last_used -= 120
+
+    pool.check_idle()
+    assert not endpoint.connected
+    assert pool.opened == 2 and pool._created["food"] == 1
+    with pool.endpoint("food") as replacement:
+        pass
+    assert replacement is not endpoint and pool.opened == 2
+
+def test_recently_used_endpoints_are_not_probed():
+    pool = _pool(size=1)
+    with pool.endpoint("food") as endpoint:
+        pass
+    pool.check_idle()
+    assert endpoint.probes == 0
@@ -0,0 +1,17 @@
+import numpy as np
+from services.image_hash_cache import ImageHashCache, dhash_gray
+
+def _gradient(offset: int = 0) -> np.ndarray:
+    row = np.arange(64, dtype=np.uint8) * 3 + offset
+    return np.tile(row, (64, 1))
+
+def test_near_duplicate_hits_within_the_same_user():
+    cache = ImageHashCache(maxsize=8, ttl=60)
+    cache.add(1, dhash_gray(_gradient()), ["milk"])
+    assert cache.lookup(1, dhash_gray(_gradient(2))) == ["milk"]
+
+def test_results_are_not_shared_across_users():
+    cache = ImageHashCache(maxsize=8, ttl=60)
+    image_hash = dhash_gray(_gradient())
+    cache.add(1, image_hash, ["milk"])
+    assert cache.lookup(2, image_hash) is None
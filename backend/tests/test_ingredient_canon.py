@@ -0,0 +1,24 @@
+import pytest
+from services.ingredient_canon import singularize, canonicalize
+
+@pytest.mark.parametrize("plural, singular", [
+    ("kiwis", "kiwi"),
+    ("zucchinis", "zucchini"),
+    ("chilies", "chili"),
+    ("chillies", "chilli"),
+    ("berries", "berry"),
+    ("tomatoes", "tomato"),
+    ("peaches", "peach"),
+    ("hummus", "hummus"),
+    ("asparagus", "asparagus"),
+    ("anis", "anis"),
+])
+def test_singularize(plural, singular):
+    assert singularize(plural) == singular
+
+@pytest.mark.parametrize("raw", ["chilli peppers", "Chilies", "chillies", "chile pepper", "chili peppers"])
+def test_chili_variants_share_one_name(raw):
+    assert canonicalize(raw) == "chili pepper"
+
+def test_kiwis():
+    assert canonicalize("Kiwis") == "kiwi"
@@ -0,0 +1,30 @@
+from services.llm_router import LLMRouter
+
+def _router() -> LLMRouter:
+    return LLMRouter([("ollama", object()), ("gemini", object())], failure_threshold=2)
+
+def test_transient_failure_keeps_configured_order():
+    router = _router()
+    ollama, gemini = router.providers
+    router.record_failure(ollama)
+    router.record_success(gemini, 0.5)
+    assert [p.name for p in router.candidates()] == ["ollama", "gemini"]
+
+def test_open_circuit_moves_provider_behind_healthy_ones():
+    router = _router()
+    ollama, gemini = router.providers
+    router.record_failure(ollama)
+    router.record_failure(ollama)
+    assert ollama.is_open
+    ollama.next_probe_at = 0  # due a half-open trial
+    assert [p.name for p in router.candidates()] == ["gemini", "ollama"]
+
+def test_all_open_prefers_most_recent_success():
+    router = _router()
+    ollama, gemini = router.providers
+    router.record_success(gemini, 0.5)
+    for p in (ollama, gemini):
+        router.record_failure(p)
+        router.record_failure(p)
+        p.next_probe_at = float("inf")
+    assert [p.name for p in router.candidates()] == ["gemini", "ollama"]
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import text, inspect
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from fastapi import Response
+import database
+from database import Base
+from models.db_models import PantryItem, RecipeGuide
+from services.guide_store import GuideStore
+
+def _legacy_engine(tmp_path, monkeypatch, rows_sql: list[tuple[str, dict]]):
+    """A database in an older shape (no unique pantry index) that init_db will upgrade."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(text("DROP INDEX uq_pantry_items_user_ingredient"))
+            for sql, params in rows_sql:
+                await conn.execute(text(sql), params)
+
+    asyncio.run(setup())
+    return engine
+
+def test_init_db_canonicalizes_legacy_pantry_names(tmp_path, monkeypatch):
+    now = datetime.utcnow()
+    insert = ("INSERT INTO pantry_items (id, user_id, ingredient_name, scan_date, days_until_expiry, expires_at) "
+              "VALUES (:id, :user_id, :name, :scan_date, 7, :scan_date)")
+    engine = _legacy_engine(tmp_path, monkeypatch, [
+        (insert, {"id": 1, "user_id": 1, "name": "Bag of Baby Carrots", "scan_date": now - timedelta(days=2)}),
+        (insert, {"id": 2, "user_id": 1, "name": "carrots", "scan_date": now - timedelta(days=1)}),
+        (insert, {"id": 3, "user_id": 1, "name": "bag of brown rice", "scan_date": now}),
+        (insert, {"id": 4, "user_id": 1, "name": "Carrot", "scan_date": now - timedelta(days=5)}),
+        (insert, {"id": 5, "user_id": 2, "name": "baby carrots", "scan_date": now}),
+    ])
+
+    async def run():
+        await database.init_db()
+        async with engine.connect() as conn:
+            stmt = select(PantryItem.id, PantryItem.user_id, PantryItem.ingredient_name).order_by(PantryItem.id)
+            rows = (await conn.execute(stmt)).all()
+            indexes = await conn.run_sync(lambda c: {i["name"] for i in inspect(c).get_indexes("pantry_items")})
+        await engine.dispose()
+        return [tuple(r) for r in rows], indexes
+
+    rows, indexes = asyncio.run(run())
+    # Newest row per (user, canonical name) survives, under the canonical name scans upsert on
+    assert rows == [(2, 1, "carrot"), (3, 1, "rice"), (5, 2, "carrot")]
+    assert "uq_pantry_items_user_ingredient" in indexes
+
+GUIDE = "# Pancakes\n\n1. Whisk the **flour** and milk.\n2. Fry until golden.\n"
+
+def test_init_db_moves_inline_guides_into_shared_rows(tmp_path, monkeypatch):
+    import app
+
+    insert = ("INSERT INTO saved_recipes (id, user_id, recipe_name, ingredients, video_url, thumbnail, accessible_guide, saved_at) "
+              "VALUES (:id, 1, :name, '[]', :url, '', :guide, :saved_at)")
+    now = datetime.utcnow()
+    other = "# Omelette\n\nBeat the eggs.\n"
+    engine = _legacy_engine(tmp_path, monkeypatch, [
+        (insert, {"id": 1, "name": "Pancakes", "url": "https://youtu.be/a", "guide": GUIDE, "saved_at": now - timedelta(days=2)}),
+        (insert, {"id": 2, "name": "Pancakes again", "url": "https://youtu.be/a", "guide": GUIDE, "saved_at": now - timedelta(days=1)}),
+        (insert, {"id": 3, "name": "Omelette", "url": "https://youtu.be/b", "guide": other, "saved_at": now}),
+    ])
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def run():
+        await database.init_db()
+        async with session_factory() as db:
+            recipes = await app.get_recipe_history(
+                response=Response(), limit=50, cursor=None, include_guide=True, payload={"id": 1}, db=db
+            )
+            guides = (await db.execute(select(RecipeGuide.id, RecipeGuide.content_hash))).all()
+            inline = (await db.execute(text("SELECT COUNT(*) FROM saved_recipes WHERE accessible_guide IS NOT NULL"))).scalar()
+            guide_ids = (await db.execute(text("SELECT guide_id FROM saved_recipes ORDER BY id"))).scalars().all()
+        await engine.dispose()
+        return recipes, guides, inline, guide_ids
+
+    recipes, guides, inline, guide_ids = asyncio.run(run())
+    assert [r.accessible_guide for r in recipes] == [other, GUIDE, GUIDE]
+    # The two identical guides share one row; the inline copies are gone
+    assert len(guides) == 2
+    assert guide_ids[0] == guide_ids[1] != guide_ids[2]
+    assert inline == 0
+
+def test_guide_store_save_deduplicates_by_content(tmp_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'guides.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            first = await GuideStore.save(db, GUIDE, "https://youtu.be/a")
+            second = await GuideStore.save(db, GUIDE, "https://youtu.be/other")
+            third = await GuideStore.save(db, GUIDE + "3. Serve.\n")
+            await db.commit()
+            body = (await db.execute(select(RecipeGuide.body).where(RecipeGuide.id == first))).scalar_one()
+        await engine.dispose()
+        return first, second, third, body
+
+    first, second, third, body = asyncio.run(run())
+    assert first == second != third
+    assert GuideStore.decompress(body) == GUIDE
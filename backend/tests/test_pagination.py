@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from database import Base, get_db
+from dependencies import require_token_payload
+from models.db_models import User, PantryItem
+
+SCAN = datetime(2026, 1, 10, 12, 0, 0)
+
+@pytest.fixture
+def client(tmp_path):
+    import app as app_module
+
+    # NullPool: the test client runs requests on its own event loop
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pages.db'}", poolclass=NullPool)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def seed():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_factory() as db:
+            db.add(User(id=1, email="a@example.com", full_name="A", google_id="g1"))
+            # Five items share one scan_date (one scan), so only id breaks the tie
+            for i in range(1, 6):
+                db.add(PantryItem(id=i, user_id=1, ingredient_name=f"item{i}", scan_date=SCAN,
+                                  days_until_expiry=i, expires_at=datetime.utcnow() + timedelta(days=i, hours=1),
+                                  urgency="low", storage="pantry"))
+            db.add(PantryItem(id=6, user_id=1, ingredient_name="older", scan_date=SCAN - timedelta(days=1),
+                              days_until_expiry=30, expires_at=datetime.utcnow() + timedelta(days=30),
+                              urgency="low", storage="pantry"))
+            await db.commit()
+
+    asyncio.run(seed())
+
+    async def override_db():
+        async with session_factory() as session:
+            yield session
+
+    app = app_module.app
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[require_token_payload] = lambda: {"id": 1}
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
+
+def _pages(client, params: dict) -> list[list[int]]:
+    pages, cursor = [], None
+    while True:
+        response = client.get("/api/pantry", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+def test_newest_first_pages_through_ties_on_scan_date(client):
+    # Ties on scan_date are ordered by id, so no row is skipped or repeated across pages
+    assert _pages(client, {"limit": 2}) == [[5, 4], [3, 2], [1, 6]]
+
+def test_full_last_page_has_no_next_cursor(client):
+    response = client.get("/api/pantry", params={"limit": 6})
+    assert len(response.json()) == 6
+    assert "X-Next-Cursor" not in response.headers
+
+def test_expiring_within_pages_soonest_first(client):
+    assert _pages(client, {"expiring_within": 4, "limit": 2}) == [[1, 2], [3]]
+
+def test_invalid_cursor_is_a_400(client):
+    response = client.get("/api/pantry", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,24 @@
+import asyncio
+from services.pantry_scan import PantryScanner, RetakeRequired
+
+class StubScanner(PantryScanner):
+    async def scan(self, raw: bytes, user_id=None) -> list[str]:
+        if raw == b"blurry":
+            raise RetakeRequired({"code": "retake", "reasons": ["blurry"]})
+        if raw == b"garbage":
+            raise ValueError("Unreadable image upload")
+        if raw == b"offline":
+            raise ConnectionError("EyePop unreachable")
+        return ["milk"]
+
+def test_one_bad_image_does_not_fail_the_batch():
+    async def run():
+        return await StubScanner().scan_many([
+            ("fridge.jpg", b"ok"), ("shelf.jpg", b"blurry"), ("receipt.jpg", b"garbage"), ("freezer.jpg", b"offline")
+        ])
+
+    fridge, shelf, receipt, freezer = asyncio.run(run())
+    assert fridge == {"filename": "fridge.jpg", "ingredients": ["milk"], "retake": None, "error": None}
+    assert shelf["retake"]["reasons"] == ["blurry"] and shelf["error"] is None
+    assert receipt["error"] == "Unreadable image upload"
+    assert freezer["error"] == "EyePop unreachable" and freezer["ingredients"] == []
@@ -0,0 +1,96 @@
+"""
+The hot queries must be served by an index rather than a table scan plus a
+sort. Checked with SQLite's EXPLAIN QUERY PLAN on an empty schema, using the
+same statement builders the app uses (queries.py, tasks/scheduler.py and
+tasks/outbox_dispatcher.py). `python -m benchmarks.query_plans` prints the
+full plans.
+"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.future import select
+from database import Base
+from models.db_models import PantryItem
+from queries import DEFAULT_PAGE_SIZE, encode_cursor, pantry_query, recipe_history_query
+from tasks.scheduler import _expiring_items_query, EXPIRY_WARNING_DAYS, EXPIRY_GRACE_DAYS
+from tasks.outbox_dispatcher import OutboxDispatcher
+
+now = datetime.utcnow()
+cursor = encode_cursor(now, 100)
+
+# name -> (statement, acceptable indexes, whether an ORDER BY must come from the index)
+CHECKS = {
+    "GET /api/pantry": (
+        pantry_query(1, now, None, None, DEFAULT_PAGE_SIZE)[0],
+        ("ix_pantry_items_user_scan",), True
+    ),
+    "GET /api/pantry?expiring_within": (
+        pantry_query(1, now, 3, None, DEFAULT_PAGE_SIZE)[0],
+        ("ix_pantry_items_user_expires",), True
+    ),
+    "GET /api/pantry (next page)": (
+        pantry_query(1, now, None, cursor, DEFAULT_PAGE_SIZE)[0],
+        ("ix_pantry_items_user_scan",), True
+    ),
+    "GET /api/pantry?expiring_within (next page)": (
+        pantry_query(1, now, 3, cursor, DEFAULT_PAGE_SIZE)[0],
+        ("ix_pantry_items_user_expires",), True
+    ),
+    "GET /api/recipes/history": (
+        recipe_history_query(1, None, DEFAULT_PAGE_SIZE, include_guide=False),
+        ("ix_saved_recipes_user_saved",), True
+    ),
+    "GET /api/recipes/history (next page)": (
+        recipe_history_query(1, cursor, DEFAULT_PAGE_SIZE, include_guide=False),
+        ("ix_saved_recipes_user_saved",), True
+    ),
+    "GET /api/recipes/history?include_guide": (
+        recipe_history_query(1, None, DEFAULT_PAGE_SIZE, include_guide=True),
+        ("ix_saved_recipes_user_saved",), True
+    ),
+    "daily expiry job": (
+        _expiring_items_query(now - timedelta(days=EXPIRY_GRACE_DAYS), now + timedelta(days=EXPIRY_WARNING_DAYS)),
+        # Only rows inside the expiry window get sorted, so a sort is fine here
+        ("ix_pantry_items_expires_at", "ix_pantry_items_user_expires"), False
+    ),
+    "outbox claim": (
+        OutboxDispatcher().claim_statement(now, "token"),
+        ("ix_notification_outbox_status_next",), False
+    ),
+}
+
+def explain(conn, stmt) -> list[str]:
+    compiled = stmt.compile(conn)
+    params = [None] * len(compiled.positiontup or ())
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), tuple(params)).fetchall()
+    return [row[-1] for row in rows]
+
+def check(plan: list[str], indexes: tuple, sorted_by_index: bool) -> list[str]:
+    problems = []
+    if not any(index in step for step in plan for index in indexes):
+        problems.append(f"does not use {' or '.join(indexes)}")
+    for step in plan:
+        if step.startswith("SCAN ") and "USING" not in step:
+            problems.append(f"full table scan: {step}")
+    if sorted_by_index and any("TEMP B-TREE" in step for step in plan):
+        problems.append("sorts in a temp b-tree instead of reading the index in order")
+    return problems
+
+@pytest.fixture(scope="module")
+def conn():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        yield conn
+
+@pytest.mark.parametrize("name", list(CHECKS))
+def test_query_plan(conn, name):
+    stmt, indexes, sorted_by_index = CHECKS[name]
+    plan = explain(conn, stmt)
+    assert check(plan, indexes, sorted_by_index) == [], "\n".join(plan)
+
+def test_check_flags_a_table_scan(conn):
+    # Guards the checker itself: an unindexed filter plus sort must be reported
+    stmt = select(PantryItem).where(PantryItem.storage == "pantry").order_by(PantryItem.urgency)
+    problems = check(explain(conn, stmt), ("ix_pantry_items_user_scan",), True)
+    assert len(problems) == 3
@@ -0,0 +1,22 @@
+import pytest
+from services.ingredient_canon import canonicalize
+from services.shelf_life_service import ShelfLifeService, STORAGE_QUALIFIERS
+
+@pytest.fixture
+def service():
+    return ShelfLifeService(learned_path=None)
+
+def test_variety_names_fall_back_to_the_head_noun(service):
+    assert service.lookup_one("cherokee tomato") == service.lookup_one("tomato")
+
+@pytest.mark.parametrize("ingredient", ["frozen chicken", "canned corn", "powdered milk", "dried mango", "smoked salmon", "shelf-stable milk", "freeze-dried mango"])
+def test_storage_changing_qualifiers_are_left_to_the_llm(service, ingredient):
+    assert service.lookup_one(ingredient) is None
+
+def test_qualified_entries_in_the_table_still_match(service):
+    assert service.lookup_one("frozen peas")["storage"] == "freezer"
+
+@pytest.mark.parametrize("qualifier", sorted(STORAGE_QUALIFIERS))
+def test_qualifiers_survive_canonicalization(qualifier):
+    # The check runs on canonical keys, so a qualifier that folds away can never match
+    assert qualifier in canonicalize(f"{qualifier} milk").split()
@@ -55,9 +55,10 @@ export const getMe = async () => {
   return response.data;
 };
 
-export const getPantry = async () => {
-  const response = await api.get('/pantry');
-  return response.data;
+// Paginated lists: the next page's cursor comes back in the X-Next-Cursor header
+export const getPantry = async (cursor = null) => {
+  const response = await api.get('/pantry', { params: cursor ? { cursor } : {} });
+  return { items: response.data, nextCursor: response.headers['x-next-cursor'] || null };
 };
 
 export const saveRecipe = async (recipeData) => {
@@ -65,9 +66,9 @@ export const saveRecipe = async (recipeData) => {
   return response.data;
 };
 
-export const getRecipeHistory = async () => {
-  const response = await api.get('/recipes/history');
-  return response.data;
+export const getRecipeHistory = async (cursor = null) => {
+  const response = await api.get('/recipes/history', { params: cursor ? { cursor } : {} });
+  return { items: response.data, nextCursor: response.headers['x-next-cursor'] || null };
 };
 
 export default api;
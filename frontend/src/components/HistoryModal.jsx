@@ -6,6 +6,10 @@ import * as api from '../api';
 const HistoryModal = ({ isOpen, onClose, type, user }) => {
   const [items, setItems] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const fetchPage = (cursor) => (type === 'pantry' ? api.getPantry(cursor) : api.getRecipeHistory(cursor));
 
   useEffect(() => {
     console.log("DEBUG: HistoryModal useEffect", { isOpen, type, userId: user?.id });
@@ -13,18 +17,13 @@ const HistoryModal = ({ isOpen, onClose, type, user }) => {
       const fetchData = async () => {
         setLoading(true);
         setItems([]); // Clear previous items to avoid type mismatch crashes
+        setNextCursor(null);
         try {
-          if (type === 'pantry') {
-            console.log("DEBUG: Fetching pantry history...");
-            const data = await api.getPantry();
-            console.log("DEBUG: Pantry data received:", data);
-            setItems(Array.isArray(data) ? data : []);
-          } else {
-            console.log("DEBUG: Fetching recipe history...");
-            const data = await api.getRecipeHistory();
-            console.log("DEBUG: Recipe data received:", data);
-            setItems(Array.isArray(data) ? data : []);
-          }
+          console.log(`DEBUG: Fetching ${type} history...`);
+          const page = await fetchPage();
+          console.log(`DEBUG: ${type} data received:`, page);
+          setItems(Array.isArray(page.items) ? page.items : []);
+          setNextCursor(page.nextCursor);
         } catch (err) {
           console.error("DEBUG: Failed to fetch history:", err);
         } finally {
@@ -35,6 +34,19 @@ const HistoryModal = ({ isOpen, onClose, type, user }) => {
     }
   }, [isOpen, type, user]);
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(nextCursor);
+      setItems((prev) => [...prev, ...(Array.isArray(page.items) ? page.items : [])]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error("DEBUG: Failed to fetch more history:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   return (
     <AnimatePresence>
       {isOpen && (
@@ -152,6 +164,15 @@ const HistoryModal = ({ isOpen, onClose, type, user }) => {
                       </div>
                     ))
                   )}
+                  {nextCursor && (
+                    <button
+                      onClick={loadMore}
+                      disabled={loadingMore}
+                      className="w-full py-3 text-sm font-bold text-teal-400 hover:text-teal-300 border border-slate-800 hover:border-teal-500/30 rounded-2xl transition-all disabled:opacity-50"
+                    >
+                      {loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                  )}
                 </div>
               )}
             </div>
@@ -1,7 +1,7 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, AIMessage
 from googleapiclient.discovery import build
-from youtube_transcript_api import YouTubeTranscriptApi
+from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
 import json, os
 
 
@@ -16,6 +16,8 @@ class SmartKitchenChain:
         )
         # Store conversation history manually
         self.chat_history = []
+        # Transcripts fetched this session (verify + generate reuse them)
+        self._transcripts = {}
         self.youtube = build('youtube', 'v3', developerKey=os.getenv('YOUTUBE_API_KEY'))
 
     def chat(self, user_input):
@@ -57,13 +59,22 @@ class SmartKitchenChain:
 
     def get_video_transcript(self, video_id):
         """Tools: Fetches transcript to let Gemini 'read' the video"""
+        if video_id in self._transcripts:
+            return self._transcripts[video_id]
         try:
             transcript = YouTubeTranscriptApi.get_transcript(video_id)
-            # Combine into a single string for the LLM
-            full_text = " ".join([entry['text'] for entry in transcript])
-            return full_text[:10000] # Limit char count to save context window
+        except (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable):
+            # Definitive "no transcript": remember it for the session
+            self._transcripts[video_id] = None
+            return None
         except Exception:
+            # Transient failure (network etc.), try again next time
             return None
+        # Combine into a single string for the LLM
+        full_text = " ".join([entry['text'] for entry in transcript])
+        full_text = full_text[:10000] # Limit char count to save context window
+        self._transcripts[video_id] = full_text
+        return full_text
 
     def verify_video_relevance(self, video, recipe_name, ingredients):
         """